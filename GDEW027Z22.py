@@ -9,8 +9,12 @@
 #               Display resolution 264x176, and the "pixel" have layout 
 #               of honeycomb.
 #               Controller: EK79652 for 2/3 colors e-ink from [???no idea??].
-#               One note, after each byte CS line must be toggled so 
-#               the send_cmd2 can't be optimized better :/
+#               One note, after each byte CS line must be toggled, so
+#               data bytes are sent as batch of 1 byte SPI segments with
+#               cs_change set, many in one ioctl (GDEWXferMode.batch), or
+#               one spidev transfer per byte (GDEWXferMode.byte).
+#               I/O is done by transport (GDEW027Z22_IO.py): spidev,
+#               bitbang, gpiomem or simulated controller (GDEW027Z22_SIM.py).
 # 
 # Date        : 2018-02-22
 # Author      : Przemyslaw W [saper_2]
@@ -18,15 +22,20 @@
 # 
 # Changelog   :
 #               - 0.1 - Initial version
+#               - 0.2 - batched per-byte-CS SPI transfers (xferMode), I/O moved
+#                       to pluggable transports (GDEW027Z22_IO.py)
 #******************************************************************************
 
 import time
-import spidev
 import sys
-import RPi.GPIO as GPIO
-from PIL import Image, ImageDraw
+import os
+import zlib
+import threading
+import queue
+# PIL and asyncio are imported when they are needed (start-up time, see bench.py)
+from GDEW027Z22_IO import GDEWXferMode, GDEWSpidevTransport
+from GDEW027Z22_FB import GDEWFrameBuffer, GDEWDither, GDEWOrientation, pack_rows, convert_image, convert_settings, dirty_window, window_data, load_raw, save_raw, is_raw
 
-from inspect import getmembers
 
 class GDEWColor:
 	white=0
@@ -34,104 +43,342 @@ class GDEWColor:
 	red=2
 	none=3 
 
+# BUSY pin was not released by controller in time
+class GDEWBusyTimeout(TimeoutError):
+	pass
+
+# Driver instrumentation: phase durations and transfer counters.
+# Phases: reset, init (whole init_ctrl), pon_wait, write_rw, write_bw, write_window, write_stream,
+#         refresh_wait, partial_wait.
+# Counters (counted by transport): bytes, ioctls, gpio (pin level writes).
+# callback(phase, seconds) is called after each phase.
+class GDEWStats:
+	def __init__(self, callback=None):
+		self.callback = callback
+		self.reset()
+
+	def reset(self):
+		# phase => [count, total, last, max] (seconds)
+		self.phases = {}
+		self.counters = { "bytes": 0, "ioctls": 0, "gpio": 0 }
+
+	def add(self, phase, t):
+		p = self.phases.get(phase)
+		if (p is None):
+			self.phases[phase] = [1, t, t, t]
+		else:
+			p[0] += 1
+			p[1] += t
+			p[2] = t
+			if (t > p[3]):
+				p[3] = t
+		if (self.callback is not None):
+			self.callback(phase, t)
+
+	def count(self, name, n=1):
+		self.counters[name] = self.counters.get(name, 0) + n
+
+	# last duration of phase (seconds) or None
+	def last(self, phase):
+		p = self.phases.get(phase)
+		if (p is None):
+			return None
+		return p[2]
+
+	def as_dict(self):
+		d = { "counters": dict(self.counters), "phases": {} }
+		for k, p in self.phases.items():
+			d["phases"][k] = { "count": p[0], "total": p[1], "last": p[2], "max": p[3] }
+		return d
+
+	def __str__(self):
+		r = []
+		for k, p in self.phases.items():
+			r.append("{}: {}x last={:.3f}ms max={:.3f}ms total={:.3f}ms".format(k, p[0], p[2]*1000, p[3]*1000, p[1]*1000))
+		r.append(" ".join([ "{}={}".format(k, v) for k, v in self.counters.items() ]))
+		return "\n".join(r)
+
+# *** controller init sequence ***
+#LUT_VCOMDC_LEN=44
+LUT_VCOMDC = [
+	0x00	,0x00,
+	0x00	,0x1A	,0x1A	,0x00	,0x00	,0x01,
+	0x00	,0x0A	,0x0A	,0x00	,0x00	,0x08,
+	0x00	,0x0E	,0x01	,0x0E	,0x01	,0x10,
+	0x00	,0x0A	,0x0A	,0x00	,0x00	,0x08,
+	0x00	,0x04	,0x10	,0x00	,0x00	,0x05,
+	0x00	,0x03	,0x0E	,0x00	,0x00	,0x0A,
+	0x00	,0x23	,0x00	,0x00	,0x00	,0x01
+]
+#LUT_WW_LEN=42
+LUT_WW = [
+	0x90	,0x1A	,0x1A	,0x00	,0x00	,0x01,
+	0x40	,0x0A	,0x0A	,0x00	,0x00	,0x08,
+	0x84	,0x0E	,0x01	,0x0E	,0x01	,0x10,
+	0x80	,0x0A	,0x0A	,0x00	,0x00	,0x08,
+	0x00	,0x04	,0x10	,0x00	,0x00	,0x05,
+	0x00	,0x03	,0x0E	,0x00	,0x00	,0x0A,
+	0x00	,0x23	,0x00	,0x00	,0x00	,0x01
+]
+#LUT_BW_LEN=42
+LUT_BW = [
+	0xA0	,0x1A	,0x1A	,0x00	,0x00	,0x01,
+	0x00	,0x0A	,0x0A	,0x00	,0x00	,0x08,
+	0x84	,0x0E	,0x01	,0x0E	,0x01	,0x10,
+	0x90	,0x0A	,0x0A	,0x00	,0x00	,0x08,
+	0xB0	,0x04	,0x10	,0x00	,0x00	,0x05,
+	0xB0	,0x03	,0x0E	,0x00	,0x00	,0x0A,
+	0xC0	,0x23	,0x00	,0x00	,0x00	,0x01
+]
+#LUT_WB_LEN=42
+LUT_WB = [
+	0x90	,0x1A	,0x1A	,0x00	,0x00	,0x01,
+	0x40	,0x0A	,0x0A	,0x00	,0x00	,0x08,
+	0x84	,0x0E	,0x01	,0x0E	,0x01	,0x10,
+	0x80	,0x0A	,0x0A	,0x00	,0x00	,0x08,
+	0x00	,0x04	,0x10	,0x00	,0x00	,0x05,
+	0x00	,0x03	,0x0E	,0x00	,0x00	,0x0A,
+	0x00	,0x23	,0x00	,0x00	,0x00	,0x01
+]
+#LUT_BB_LEN=42
+LUT_BB = [
+	0x90	,0x1A	,0x1A	,0x00	,0x00	,0x01,
+	0x20	,0x0A	,0x0A	,0x00	,0x00	,0x08,
+	0x84	,0x0E	,0x01	,0x0E	,0x01	,0x10,
+	0x10	,0x0A	,0x0A	,0x00	,0x00	,0x08,
+	0x00	,0x04	,0x10	,0x00	,0x00	,0x05,
+	0x00	,0x03	,0x0E	,0x00	,0x00	,0x0A,
+	0x00	,0x23	,0x00	,0x00	,0x00	,0x01
+]
+
+# Compile list of (cmd, [params]) into blob of records: cmd, param count, params...
+# Blobs are build once (at import) and replayed with GDEW027Z22.send_blob().
+def init_blob(seq):
+	b = bytearray()
+	for cmd, parm in seq:
+		b.append(cmd)
+		b.append(len(parm))
+		b.extend(parm)
+	return bytes(b)
+
+INIT_POWER = init_blob([
+	# power settings
+	# REG_POWER[0x01] 
+	#     P0=VDS_INT[0x02] | VDG_INT[0x01] 
+	#     P1=VCOM_with_VCOMDC[0x00] | VGL_16V[0x00] 
+	#     P2=VDH_11V[0x2b]
+	#     P3=VDL_11V[0x2b]
+	#     P4=VDHR_4.2V[0x09]
+	(0x01, [0x03, 0x00, 0x2b, 0x2b, 0x09]),
+	# setup booster
+	# CMD_BTST[0x06]
+	#     P0=BTPHA_10ms[0x00] | BTPHA_S1[0x00] | BTPHA_OFF6.58us[0x07]
+	#     P1=BTPHB_10ms[0x00] | BTPHB_S1[0x00] | BTPHB_OFF6.58us[0x07]
+	#     P2=BTPHC_S3[0x10] | BTPHC_OFF6.58us[0x07]
+	(0x06, [0x07, 0x07, 0x17])
+])
+
+INIT_PON = init_blob([
+	# power optimization - no reference in datasheet for command 0xF8!
+	(0xf8, [0x60, 0xa5]),
+	(0xf8, [0x89, 0xa5]),
+	(0xf8, [0x90, 0x00]),
+	(0xf8, [0x93, 0x2a]),
+	(0xf8, [0x73, 0x41]),
+	# power ON
+	# CMD_PON[0x04]
+	(0x04, [])
+])
+
+INIT_PANEL = init_blob([
+	# panel settings
+	# CMD_PSR[0x00]
+	#       P0=RES_296x160[0x80] | LUT_REG[0x20] | BWR_ON[0x00] | GateScan_UP[0x08] | SourceShift_LEFT[0x00] | BOOSTER_ON[0x02] | NO_RESET[0x01]
+	(0x00, [0xab]),
+	# pll control
+	# CMD_PLL[0x30]
+	#      P0=DIV_01[0x20] | PLL_F[0x1a]
+	(0x30, [0x3a]),
+	# resolution settings
+	# CMD_TRES[0x61]
+	#      P0=H_RES(bit8)
+	#      P1=H_RES(bit7..0) (bit0 alwas 0!)
+	#      P2=V_RES(bit8)
+	#      P3=V_RES(bit7..0)
+	(0x61, [ ((176>>8)&0x01) , (176&0x00ff), ((264>>8)&0x0001), (264 & 0x00ff) ]),
+	# VCM_DC setting
+	# CMD_VDCS[0x82]
+	#      P0=VDCS_-1.0V[0x12]
+	(0x82, [ 0x12 ]),
+	# VCOM and data interval
+	# CMD_CDI[0x50]
+	#      P0=CDI_VBD_10[0x80] | CDI_DDX_10[0x00] | CDI_10hSync-s[0x07]
+	(0x50, [ 0x87 ]),
+	# *** load LUT tables ***
+	(0x20, LUT_VCOMDC),	# LUTC[0x20]
+	(0x21, LUT_WW),		# LUTWW[0x21]
+	(0x22, LUT_BW),		# LUTBW[0x22]
+	(0x23, LUT_WB),		# LUTWB[x023]
+	(0x24, LUT_BB)		# LUTBB[0x24]
+])
+
+# warm attach marker content: kernel boot id + checksum of init sequence,
+# so marker from before reboot or from other init sequence is not accepted
+def boot_id():
+	try:
+		with open("/proc/sys/kernel/random/boot_id") as f:
+			return f.read().strip()
+	except:
+		return "-"
+
+INIT_ID = "{:08x}".format(zlib.crc32(INIT_POWER + INIT_PON + INIT_PANEL))
+
 class GDEW027Z22:
-	def __init__(self, spiBus=0, spiCs=0, spiClockHz=5000, dcPin=25, rstPin=24, bsyPin=23, halfBitDelay=0.000001):
-		#self.spi_bus =
-		self.spi_bus = spiBus
-		self.pin_dc = dcPin
-		self.spi_cs = spiCs
-		self.pin_rst = rstPin
-		self.pin_bsy = bsyPin
-		self.hdelay=halfBitDelay
+	# transport: GDEWTransport object (see GDEW027Z22_IO.py / GDEW027Z22_SIM.py), when None
+	# hardware SPI transport is created from spiBus..xferMode parameters.
+	# dither: GDEWDither mode used by fb_load (none = plain threshold).
+	# rotate/mirror: orientation of images and drawing (see set_orientation).
+	# frameCache: GDEWFrameCache object (GDEW027Z22_CACHE.py) used by fb_load, or None.
+	# glyphCache: GDEWGlyphCache (GDEW027Z22_TEXT.py) used by fb_text (None = shared one).
+	# warm=1: skip reset and init when marker in stateFile says that controller is still
+	# powered on and initialized (left so by previous process, see shutdown()/deep_sleep()).
+	# Default stateFile is per SPI bus and CS: $TMPDIR/GDEW027Z22-<bus>.<cs>.state.
+	def __init__(self, spiBus=0, spiCs=0, spiClockHz=5000, dcPin=25, rstPin=24, bsyPin=23, halfBitDelay=0.000001, xferMode=GDEWXferMode.byte, busyTimeout=30.0, partialMax=0.0, transport=None, stats=0, statsHook=None, warm=0, stateFile=None, frameCache=None, dither=GDEWDither.none, rotate=0, mirror=0, glyphCache=None):
+		if (transport is None):
+			transport = GDEWSpidevTransport(spiBus, spiCs, spiClockHz, dcPin, rstPin, bsyPin, halfBitDelay, xferMode)
+		self.io = transport
+		# instrumentation (GDEWStats) or None when off
+		self.stats = None
+		if (stats or statsHook is not None):
+			self.stats_on(statsHook)
+		self.busy_timeout=busyTimeout
+		self.busy_time=0.0
+		self.alock=None
+		# fb_update use partial window update when changed area is <= partialMax of whole display (0 = off)
+		self.partial_max=partialMax
+		# shadow of controller RAM counters:
+		#   plane_hits    - plane writes skipped (data unchanged)
+		#   plane_sent    - plane writes sent
+		#   refresh_skips - fb_update calls without display refresh (nothing changed)
+		#   refreshes     - display refreshes started
+		#   partial       - partial window refreshes started
+		self.shadow_stats = { "plane_hits": 0, "plane_sent": 0, "refresh_skips": 0, "refreshes": 0, "partial": 0 }
 		# some constans
 		self.WIDTH=264
 		self.HEIGHT=176
 		self.color = GDEWColor
 		# internal variables
-		self.img = Image.new("RGB", (176,264), (0xff,0xff,0xff))
-		# setup I/O
-		GPIO.setmode(GPIO.BCM)
-		# data pin
-		# setup SPI
-		self.spi = spidev.SpiDev()
-		self.spi.open(self.spi_bus,self.spi_cs)
-		self.spi.mode = 0b00 # mode 0 (data latched on rising edge, on falling update, idle clk: low)
-		self.spi.max_speed_hz = spiClockHz
-		#self.spi.threewire=True
-		#GPIO.setup(self.pin_dta,GPIO.IN, pull_up_down=GPIO.PUD_UP)
-		# clock
-		#GPIO.setup(self.pin_clk, GPIO.OUT, initial=0)
-		# D/C
-		GPIO.setup(self.pin_dc, GPIO.OUT, initial=1)
-		# /RST
-		GPIO.setup(self.pin_rst, GPIO.OUT, initial=1)
-		# /BSY
-		GPIO.setup(self.pin_bsy, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+		self.fb = GDEWFrameBuffer(176, 264)
+		self._img = None
+		self.orient = GDEWOrientation(rotate, mirror, self.HEIGHT, self.WIDTH)
+		self.frame_cache = frameCache
+		self.glyph_cache = glyphCache
+		self.dither = dither
+		if (stateFile is None):
+			# one marker per panel: SPI bus + CS (CS pin for bitbang transports)
+			bus = getattr(transport, "spi_bus", spiBus)
+			cs = getattr(transport, "spi_cs", getattr(transport, "pin_cs", spiCs))
+			stateFile = os.path.join(os.environ.get("TMPDIR") or "/tmp", "GDEW027Z22-{}.{}.state".format(bus, cs))
+		self.state_file = stateFile
+		# marker is written only when warm attach is used
+		self.use_warm = warm
+		self.warm = 0
+		if (warm and self.state_valid()):
+			# controller keeps its registers, only RAM content is unknown
+			self.warm = 1
+			self.ram = { 0x10: None, 0x13: None }
+			self.ram_dirty = 1
+			self.busy_wait()
+			return
+		self.reset()
+		
+	# controller reset + init (also to wake up from deep sleep)
+	def reset(self):
 		# perform controller reset
+		t = self.phase_start()
 		self.pin_rst_lo()
 		time.sleep(0.01) # 10ms delay
 		self.pin_rst_hi()
 		time.sleep(0.1) # after reset delay
+		self.phase_end("reset", t)
 		# now init controller
+		t = self.phase_start()
 		self.init_ctrl()
+		self.phase_end("init", t)
 		
-	# restor GPIO to defaults
+	# restor GPIO to defaults (with warm attach /RST stays high, so controller
+	# is not reset between runs and state file stays true)
 	def __del__(self):
-		self.spi.close()
-		GPIO.cleanup()
+		io = getattr(self, "io", None)
+		if (io is not None):
+			io.close(getattr(self, "use_warm", 0))
 		
+	# enable instrumentation, callback(phase, seconds) is called after each phase
+	def stats_on(self, callback=None):
+		self.stats = GDEWStats(callback)
+		self.io.stats = self.stats
+		return self.stats
+	
+	def stats_off(self):
+		self.stats = None
+		self.io.stats = None
+	
+	# phase timing, does nothing when instrumentation is off
+	def phase_start(self):
+		if (self.stats is None):
+			return 0
+		return time.perf_counter()
+	
+	def phase_end(self, phase, t0):
+		if (self.stats is not None):
+			self.stats.add(phase, time.perf_counter() - t0)
+	
 	# reset pin
 	def pin_rst_lo(self):
-		GPIO.output(self.pin_rst, 0)
+		self.io.set_rst(0)
 	
 	def pin_rst_hi(self):
-		GPIO.output(self.pin_rst, 1)
+		self.io.set_rst(1)
 
 	# busy pin
 	def pin_get_bsy(self):
-		if GPIO.input(self.pin_bsy):
-			return 1
-		else:
-			return 0
+		return self.io.get_bsy()
 			
 	# d/c pin
 	def pin_dc_hi(self):
-		GPIO.output(self.pin_dc, 1)
+		self.io.set_dc(1)
 	
 	def pin_dc_lo(self):
-		GPIO.output(self.pin_dc, 0)
-	
-	# /cs pin
-	def pin_cs_hi(self):
-		GPIO.output(self.pin_cs, 1)
-	
-	def pin_cs_lo(self):
-		GPIO.output(self.pin_cs, 0)
+		self.io.set_dc(0)
 	
 	#send byte
 	def send_byte(self, b):
-		b = b & 0x00ff
-		t = [ b ]
-		self.spi.xfer( t , self.spi.max_speed_hz, 1)
-		#self.spi.writebytes( t )
-		time.sleep(self.hdelay)
+		self.io.write( [ b & 0x00ff ] )
 		
 	#get byte
 	def get_byte(self):
-		r = self.spi.xfer([0xff])
-		try: 
-			if (len(r) < 1):
-				print("Get byte 0 length!")
-				return 0
-		except:
-			return 0
-		time.sleep(self.hdelay)
-		return r[0]
+		return self.io.read_byte()
 	
-	# wait for busy
-	def busy_wait(self):
+	# wait for busy (BUSY low = controller is busy). Thread sleeps until rising edge 
+	# on BUSY pin (GPIO edge detection) instead of polling the pin.
+	# timeout in seconds (None = use busyTimeout from constructor, 0 = wait forever),
+	# raise GDEWBusyTimeout if BUSY is not released in time.
+	# Return time spent on waiting in seconds (also stored in self.busy_time).
+	def busy_wait(self, timeout=None):
+		if (timeout is None):
+			timeout = self.busy_timeout
+		t0 = time.monotonic()
 		while self.pin_get_bsy() == 0:
-			time.sleep(0.000001)
+			left = 0.1
+			if (timeout):
+				left = timeout - (time.monotonic() - t0)
+				if (left <= 0):
+					self.busy_time = time.monotonic() - t0
+					raise GDEWBusyTimeout("BUSY not released after {:.3f}s (timeout {}s)".format(self.busy_time, timeout))
+			# edge can come between pin check and wait, so wait max 100ms and check pin again
+			self.io.wait_bsy(min(left, 0.1))
+		self.busy_time = time.monotonic() - t0
+		return self.busy_time
 	
 	def send_cmd(self, cmd):
 		self.pin_dc_lo()
@@ -146,11 +393,8 @@ class GDEW027Z22:
 		self.pin_dc_lo()
 		self.send_byte(cmd)
 		self.pin_dc_hi()
-		# pcnt not used here
-		# each byte must end with CS toggle, so we have to send by one byte eveything
-		for i in range(0, pcnt):
-			self.send_byte( parm[i] )
-		#self.spi.writebytes( parm )
+		# each byte must end with CS toggle (transport take care of it)
+		self.io.write( parm[0:pcnt] )
 		
 	def send_cmd_read1(self, cmd):
 		rr = 0;
@@ -164,182 +408,148 @@ class GDEW027Z22:
 		
 		return rr
 	
+	# Write plane data (cmd: DTM1[0x10] or DTM2[0x13]), data must have exactly 5808 bytes.
+	# Last data sent to each plane is kept (shadow of controller RAM), if plane 
+	# already hold the same data it is not sent again (set force=1 to send anyway).
+	# Function return 0 if data was sent, 3 if skipped (plane unchanged).
+	def write_plane(self, cmd, data, force=0):
+		if (force == 0 and self.ram[cmd] == data):
+			self.shadow_stats["plane_hits"] += 1
+			return 3
+		self.ram[cmd] = None
+		t = self.phase_start()
+		self.send_cmd2(cmd, 5808, data)
+		self.phase_end("write_bw" if cmd == 0x10 else "write_rw", t)
+		self.ram[cmd] = data
+		self.ram_dirty = 1
+		self.shadow_stats["plane_sent"] += 1
+		return 0
+	
 	# Write Black/White pixels data. display_data must have exactly 5808 bytes length.
-	# Function return 0 on success, 1 if data is not equal 5808 bytes, 2 if data is malformed (wrong type/etc.)
-	def write_bw(self, display_data):
+	# Function return 0 on success (also when plane already hold this data), 1 if data is not equal 5808 bytes, 2 if data is malformed (wrong type/etc.)
+	def write_bw(self, display_data, force=0):
 		try:
 			if (len(display_data) != 5808):
 				return 1
 			
 			# B/W Data: CMD_DTM1[0x10]
-			self.send_cmd2(0x10, 5808, display_data)
+			self.write_plane(0x10, bytes(display_data), force)
 		except:
 			return 2
 		return 0
 	
 	# Write Red/White pixels data. display_data must have exactly 5808 bytes length.
-	# Function return 0 on success, 1 if data is not equal 5808 bytes, 2 if data is malformed (wrong type/etc.)
-	def write_rw(self, display_data):
+	# Function return 0 on success (also when plane already hold this data), 1 if data is not equal 5808 bytes, 2 if data is malformed (wrong type/etc.)
+	def write_rw(self, display_data, force=0):
 		try:
 			if (len(display_data) != 5808):
 				return 1
 			
-			# B/W Data: CMD_DTM2[0x13]
-			self.send_cmd2(0x13, 5808, display_data)
+			# R/W Data: CMD_DTM2[0x13]
+			self.write_plane(0x13, bytes(display_data), force)
 		except:
 			return 2
 		return 0
 	
-	# clear B/W to white (or to pattern[byte])
-	def clear_bw(self, pattern=0x00):
+	# fill whole plane (cmd: DTM1[0x10] or DTM2[0x13]) with pattern[byte].
+	# Pattern is sent as one data block (batched in GDEWXferMode.batch), filling 
+	# plane that already hold the pattern is skipped (set force=1 to send anyway).
+	# Function return 0 if plane was filled, 1 if skipped (controller RAM already hold pattern).
+	def fill_plane(self, cmd, pattern=0x00, force=0):
 		pattern = pattern & 0x00ff
-		self.send_cmd(0x10)
-		for i in range(0,5808):
-			self.send_data(pattern)
+		if (self.write_plane(cmd, bytes([pattern]) * 5808, force) == 3):
+			return 1
+		return 0
 	
-	# clear R/W to white (or pattern[byte])
-	def clear_rw(self, pattern=0x00):
-		pattern = pattern & 0x00ff
-		self.send_cmd(0x13)
-		for i in range(0,5808):
-			self.send_data(pattern)
+	# clear B/W to white (or to pattern[byte]), return same as fill_plane
+	def clear_bw(self, pattern=0x00, force=0):
+		return self.fill_plane(0x10, pattern, force)
+	
+	# clear R/W to white (or pattern[byte]), return same as fill_plane
+	def clear_rw(self, pattern=0x00, force=0):
+		return self.fill_plane(0x13, pattern, force)
 	
 	# send Data transmission end to the controller and start display refresh (wait for busy to be released!) (set noWait to 1 to skip busy wait)
 	# retrun 0x80 if whole display buffer(s) were filled, or 0x00 if not.
+	# Refresh time (busy wait) is stored in self.busy_time.
 	def update(self, noWait=0):
 		r = self.send_cmd_read1(0x11)
+		self.ram_dirty = 0
+		self.shadow_stats["refreshes"] += 1
 		if (noWait==0):
+			t = self.phase_start()
 			self.busy_wait()
+			self.phase_end("refresh_wait", t)
 		return r
 	
+	# send precompiled command blob (see init_blob), parameters of each
+	# command go as one data block (batched in GDEWXferMode.batch)
+	def send_blob(self, blob):
+		i = 0
+		n = len(blob)
+		while (i < n):
+			cnt = blob[i+1]
+			if (cnt == 0):
+				self.send_cmd(blob[i])
+			else:
+				self.send_cmd2(blob[i], cnt, blob[i+2:i+2+cnt])
+			i = i + 2 + cnt
+	
+	# warm attach marker: written after init, removed on shutdown/deep sleep and
+	# before init (so interrupted init is not trusted)
+	def state_valid(self):
+		try:
+			with open(self.state_file) as f:
+				return f.read().split() == [ boot_id(), INIT_ID ]
+		except:
+			return False
+	
+	def state_save(self):
+		if (self.use_warm == 0):
+			return
+		try:
+			with open(self.state_file, "w") as f:
+				f.write("{} {}\n".format(boot_id(), INIT_ID))
+		except Exception as ex:
+			print("\033[33m" + "Can't write state file {}: {}".format(self.state_file, ex) + "\033[0m")
+	
+	# (also without warm attach: marker left by earlier warm run for this panel
+	# is not valid after this process reset or powered off the controller)
+	def state_clear(self):
+		if (self.use_warm == 0 and os.path.exists(self.state_file) == False):
+			return
+		try:
+			os.remove(self.state_file)
+		except FileNotFoundError:
+			pass
+		except Exception as ex:
+			print("\033[33m" + "Can't remove state file {}: {}".format(self.state_file, ex) + "\033[0m")
+	
 	# init controller
 	def init_ctrl(self):
-		#LUT_VCOMDC_LEN=44
-		lut_vcomdc = [
-			0x00	,0x00,
-			0x00	,0x1A	,0x1A	,0x00	,0x00	,0x01,
-			0x00	,0x0A	,0x0A	,0x00	,0x00	,0x08,
-			0x00	,0x0E	,0x01	,0x0E	,0x01	,0x10,
-			0x00	,0x0A	,0x0A	,0x00	,0x00	,0x08,
-			0x00	,0x04	,0x10	,0x00	,0x00	,0x05,
-			0x00	,0x03	,0x0E	,0x00	,0x00	,0x0A,
-			0x00	,0x23	,0x00	,0x00	,0x00	,0x01
-		]
-		#LUT_WW_LEN=42
-		lut_ww = [
-			0x90	,0x1A	,0x1A	,0x00	,0x00	,0x01,
-			0x40	,0x0A	,0x0A	,0x00	,0x00	,0x08,
-			0x84	,0x0E	,0x01	,0x0E	,0x01	,0x10,
-			0x80	,0x0A	,0x0A	,0x00	,0x00	,0x08,
-			0x00	,0x04	,0x10	,0x00	,0x00	,0x05,
-			0x00	,0x03	,0x0E	,0x00	,0x00	,0x0A,
-			0x00	,0x23	,0x00	,0x00	,0x00	,0x01
-		]
-		#LUT_BW_LEN=42
-		lut_bw = [
-			0xA0	,0x1A	,0x1A	,0x00	,0x00	,0x01,
-			0x00	,0x0A	,0x0A	,0x00	,0x00	,0x08,
-			0x84	,0x0E	,0x01	,0x0E	,0x01	,0x10,
-			0x90	,0x0A	,0x0A	,0x00	,0x00	,0x08,
-			0xB0	,0x04	,0x10	,0x00	,0x00	,0x05,
-			0xB0	,0x03	,0x0E	,0x00	,0x00	,0x0A,
-			0xC0	,0x23	,0x00	,0x00	,0x00	,0x01
-		]
-		#LUT_WB_LEN=42
-		lut_wb = [
-			0x90	,0x1A	,0x1A	,0x00	,0x00	,0x01,
-			0x40	,0x0A	,0x0A	,0x00	,0x00	,0x08,
-			0x84	,0x0E	,0x01	,0x0E	,0x01	,0x10,
-			0x80	,0x0A	,0x0A	,0x00	,0x00	,0x08,
-			0x00	,0x04	,0x10	,0x00	,0x00	,0x05,
-			0x00	,0x03	,0x0E	,0x00	,0x00	,0x0A,
-			0x00	,0x23	,0x00	,0x00	,0x00	,0x01
-		]
-		#LUT_BB_LEN=42
-		lut_bb = [
-			0x90	,0x1A	,0x1A	,0x00	,0x00	,0x01,
-			0x20	,0x0A	,0x0A	,0x00	,0x00	,0x08,
-			0x84	,0x0E	,0x01	,0x0E	,0x01	,0x10,
-			0x10	,0x0A	,0x0A	,0x00	,0x00	,0x08,
-			0x00	,0x04	,0x10	,0x00	,0x00	,0x05,
-			0x00	,0x03	,0x0E	,0x00	,0x00	,0x0A,
-			0x00	,0x23	,0x00	,0x00	,0x00	,0x01
-		]
-		# power settings
-		# REG_POWER[0x01] 
-		#     P0=VDS_INT[0x02] | VDG_INT[0x01] 
-		#     P1=VCOM_with_VCOMDC[0x00] | VGL_16V[0x00] 
-		#     P2=VDH_11V[0x2b]
-		#     P3=VDL_11V[0x2b]
-		#     P4=VDHR_4.2V[0x09]
-		self.send_cmd2(0x01, 5, [0x03, 0x00, 0x2b, 0x2b, 0x09])
-		
-		# setup booster
-		# CMD_BTST[0x06]
-		#     P0=BTPHA_10ms[0x00] | BTPHA_S1[0x00] | BTPHA_OFF6.58us[0x07]
-		#     P1=BTPHB_10ms[0x00] | BTPHB_S1[0x00] | BTPHB_OFF6.58us[0x07]
-		#     P2=BTPHC_S3[0x10] | BTPHC_OFF6.58us[0x07]
-		self.send_cmd2(0x06, 3, [0x07, 0x07, 0x17])
+		# controller RAM content is unknown after reset
+		self.ram = { 0x10: None, 0x13: None }
+		self.ram_dirty = 1
+		self.state_clear()
+		# power settings + booster
+		self.send_blob(INIT_POWER)
 		time.sleep(0.005)
-		
-		# power optimization - no reference in datasheet for command 0xF8!
-		self.send_cmd2(0xf8, 2, [0x60, 0xa5])
-		self.send_cmd2(0xf8, 2, [0x89, 0xa5])
-		self.send_cmd2(0xf8, 2, [0x90, 0x00])
-		self.send_cmd2(0xf8, 2, [0x93, 0x2a])
-		self.send_cmd2(0xf8, 2, [0x73, 0x41])
-		
-		# power ON
-		# CMD_PON[0x04]
-		self.send_cmd(0x04)
+		# 0xF8 pokes + power ON
+		self.send_blob(INIT_PON)
 		time.sleep(0.00001)
 		# display will hold down busy for power-on sequence
+		t = self.phase_start()
 		self.busy_wait()
-		
-		# panel settings
-		# CMD_PSR[0x00]
-		#       P0=RES_296x160[0x80] | LUT_REG[0x20] | BWR_ON[0x00] | GateScan_UP[0x08] | SourceShift_LEFT[0x00] | BOOSTER_ON[0x02] | NO_RESET[0x01]
-		self.send_cmd2(0x00, 1, [0xab])
-		
-		# pll control
-		# CMD_PLL[0x30]
-		#      P0=DIV_01[0x20] | PLL_F[0x1a]
-		self.send_cmd2(0x30, 1, [0x3a])
-		
-		# resolution settings
-		# CMD_TRES[0x61]
-		#      P0=H_RES(bit8)
-		#      P1=H_RES(bit7..0) (bit0 alwas 0!)
-		#      P2=V_RES(bit8)
-		#      P3=V_RES(bit7..0)
-		self.send_cmd2(0x61, 4, [ ((self.HEIGHT>>8)&0x01) , (self.HEIGHT&0x00ff), ((self.WIDTH>>8)&0x0001), (self.WIDTH & 0x00ff) ])
-		
-		# VCM_DC setting
-		# CMD_VDCS[0x82]
-		#      P0=VDCS_-1.0V[0x12]
-		self.send_cmd2(0x82, 1, [ 0x12 ])
-		
-		# VCOM and data interval
-		# CMD_CDI[0x50]
-		#      P0=CDI_VBD_10[0x80] | CDI_DDX_10[0x00] | CDI_10hSync-s[0x07]
-		self.send_cmd2(0x50, 1, [ 0x87 ])
-		
-		# *** load LUT tables ***
-		# LUTC[0x20]
-		self.send_cmd2(0x20, 44, lut_vcomdc)
-		# LUTWW[0x21]
-		self.send_cmd2(0x21, 42, lut_ww)
-		# LUTBW[0x22]
-		self.send_cmd2(0x22, 42, lut_bw)
-		# LUTWB[x023]
-		self.send_cmd2(0x23, 42, lut_wb)
-		# LUTBB[0x24]
-		self.send_cmd2(0x24, 42, lut_bb)
+		self.phase_end("pon_wait", t)
+		# panel settings + LUT tables
+		self.send_blob(INIT_PANEL)
+		self.state_save()
 		
 		# end init controller
 		
 	def shutdown(self):
 		self.busy_wait()
+		self.state_clear()
 		# CMD_CDI[0x50] , P0=CDI_VBD_11[0x80] | DDX_10[0x00] | CDI_10hSyncs[0x07]
 		self.send_cmd2(0x50, 1, [0x87]);
 		# power off: CMD_POF[0x02]
@@ -347,147 +557,424 @@ class GDEW027Z22:
 		
 	def deep_sleep(self):
 		self.busy_wait()
+		self.state_clear()
+		# RAM is lost in deep sleep
+		self.ram = { 0x10: None, 0x13: None }
+		self.ram_dirty = 1
 		# CMD_DSLP[0x07] , P0=CHECK_CODE[0xa5]
 		self.send_cmd2(0x07, 1, [0xa5]);
 		
 	# ****** GRAPHIC ROUTINES ********
 	# display self.WIDTH & self.HEIGHT are swapped to portrait mode in relation to x and y (x is height , y is width) - this apply for bounds check only
-	def fb_fill(self, r=0xff, g=0xff, b=0xff):
-		#
-		d = ImageDraw.Draw(self.img)
-		d.Draw.rectangle([(0,0),(175,263)], [r,g,b], [r,g,b])
-		
+	# With orientation (set_orientation) x, y and images are in rotated image
+	# (self.orient.width x self.orient.height), framebuffer stay in panel layout.
+	# Framebuffer is kept as two bitplanes (self.fb, GDEWFrameBuffer) in display layout.
+	# self.img is PIL view of it, created on first use. Image can be changed by caller
+	# (ImageDraw etc.) so while it exists it is packed back to planes before push, and
+	# before first bit operation (after which it is dropped).
+	@property
+	def img(self):
+		if (self._img is None):
+			self._img = self.fb.to_pil(self.orient)
+		return self._img
+	
+	@img.setter
+	def img(self, im):
+		self._img = im
+	
+	# pack PIL view into planes and drop it, called before bit operations
+	def fb_sync(self):
+		if (self._img is not None):
+			self.fb.from_pil(self._img, self.orient)
+			self._img = None
+		return self.fb
+	
+	# color (GDEWColor) from RGB, same thresholds as quantize
+	def rgb_color(self, r, g, b):
+		if (g < 0x80 and b < 0x80):
+			if (r < 0x80):
+				return GDEWColor.black
+			return GDEWColor.red
+		return GDEWColor.white
+	
+	# fill whole framebuffer with rgb (snapped to white/black/red)
 	def fb_fill(self, rgb=0xffffff):
-		#
-		d = ImageDraw.Draw(self.img)
-		d.rectangle([(0,0),(175,263)], "#{:06x}".format(rgb), "#{:06x}".format(rgb))
+		self.fb_sync().fill(self.rgb_color((rgb >> 16) & 0xff, (rgb >> 8) & 0xff, rgb & 0xff))
 		
-	# set pixel to color. W=0,B=1,R=2 (any other colro value will result with white)
-	def fb_set_pix(self, x, y, color=0):
-		# check pixelpos
-		if (x >= self.HEIGHT):
-			x=self.HEIGHT-1
-		if (y >= self.WIDTH):
-			y=self.WIDTH-1
-		# check color
-		r = 0xff
-		gb = 0xff
-		if (color == 1):
-			r=0x00
-			gb=0x00
-		elif (color == 2):
-			r=0xff
-			gb=0x00
-		# for 3 colors: red, white, black I need the red color, for green and blue those will have always same value
-		self.img[x,y] = (r, gb, gb)
-	
-	def fb_set_pix(self, x, y, r, g, b):
+	# set orientation: image is mirrored left-right (mirror=1) and rotated by rotate
+	# degrees clockwise (0, 90, 180, 270). 90/270 is landscape (264x176 image).
+	# Framebuffer content stays on the panel as it is.
+	def set_orientation(self, rotate=0, mirror=0):
+		self.fb_sync()
+		self.orient = GDEWOrientation(rotate, mirror, self.HEIGHT, self.WIDTH)
+	
+	# set pixel to color: W=0,B=1,R=2 (any other color value will result with white)
+	# or fb_set_pix(x, y, r, g, b)
+	def fb_set_pix(self, x, y, color=0, g=None, b=None):
 		# check pixelpos
-		if (x >= self.WIDTH):
-			x=self.WIDTH-1
-		if (y >= self.HEIGHT):
-			y=self.HEIGHT-1
-		# for 3 colors: red, white, black I need the red color, for green and blue those will have always same value
-		self.img[x,y] = (r, g, b)
+		if (x >= self.orient.width):
+			x=self.orient.width-1
+		if (y >= self.orient.height):
+			y=self.orient.height-1
+		if (g is not None):
+			color = self.rgb_color(color, g, b)
+		self.fb_sync().set_pix(*self.orient.to_native(x, y), color)
 	
+	# return pixel color (GDEWColor), position is checked as in fb_set_pix
+	# (too big is clamped, negative is out of buffer = white)
 	def fb_get_pix(self, x, y):
-		return self.img[x,y]
+		x = min(x, self.orient.width - 1)
+		y = min(y, self.orient.height - 1)
+		return self.fb_sync().get_pix(*self.orient.to_native(x, y))
+	
+	# rectangle from (x0,y0) to (x1,y1), filled when fill=1
+	# (rectangle stays rectangle in any orientation, only corners are mapped)
+	def fb_rect(self, x0, y0, x1, y1, color=GDEWColor.black, fill=0):
+		x0, y0 = self.orient.to_native(x0, y0)
+		x1, y1 = self.orient.to_native(x1, y1)
+		if (fill):
+			self.fb_sync().fill_rect(x0, y0, x1, y1, color)
+		else:
+			self.fb_sync().rect(x0, y0, x1, y1, color)
+	
+	# line between native points (horizontal or vertical in framebuffer)
+	def fb_line_native(self, x0, y0, x1, y1, color):
+		if (y0 == y1):
+			self.fb_sync().hline(x0, x1, y0, color)
+		else:
+			self.fb_sync().vline(x0, y0, y1, color)
+	
+	def fb_hline(self, x0, x1, y, color=GDEWColor.black):
+		self.fb_line_native(*self.orient.to_native(x0, y), *self.orient.to_native(x1, y), color)
+	
+	def fb_vline(self, x, y0, y1, color=GDEWColor.black):
+		self.fb_line_native(*self.orient.to_native(x, y0), *self.orient.to_native(x, y1), color)
+
+	# text drawn straight into planes from glyph atlas (GDEW027Z22_TEXT.py),
+	# x, y - top left of first line, font - TrueType file or None (PIL default font).
+	# Return x after the text.
+	def fb_text(self, x, y, text, color=GDEWColor.black, font=None, size=16):
+		if (self.glyph_cache is None):
+			from GDEW027Z22_TEXT import glyph_cache
+			self.glyph_cache = glyph_cache
+		return self.glyph_cache.draw(self.fb_sync(), x, y, text, color, font, size, self.orient)
 	
 	def fb_load_pil(self, pil_image):
 		#bigger image wil be clipped to the display size
 		nw = pil_image.size[0] #width
 		nh = pil_image.size[1] #height
-		if (nw > self.HEIGHT):
-			nw = self.HEIGHT
-		if (nh > self.WIDTH):
-			nh = self.WIDTH
+		if (nw > self.orient.width):
+			nw = self.orient.width
+		if (nh > self.orient.height):
+			nh = self.orient.height
 		
-		self.img.paste(pil_image,(0,0,nw-1,nh-1))
+		self.img.paste(pil_image.crop((0,0,nw,nh)),(0,0))
 		
 	
-	def fb_load(self, fname):
+	def fb_load(self, fname, dither=None):
 		# load from file image, bigger image will be shrinked.
 		# convert partial colors: red[rgb=0x80+,0x00,0x00]/black[rgb=r&g&b<=0x80]/white[rgb=r&g&b>0x80] 
 		# to full "red[rgb=0xff0000]" "black[rgb=0x000000]" "white[rgb=0xffffff]"
-		fi = Image.open(fname)
-		if (fi.size[0] > self.HEIGHT or fi.size[1] > self.WIDTH):
-			fi.thumbnail((self.HEIGHT,self.WIDTH), Image.NEAREST)
-		
-		for x in range(0, fi.size[0]):
-			for y in range(0,fi.size[1]):
-				c = fi.getpixel((x,y))
-				c0 = c[0]
-				c1 = c[1]
-				c2 = c[2]
-				if (c0 >= 0x80 and c1 < 0x80 and c2 < 0x80):
-					c0 = 0xff
-					c1 = c2 = 0
-				elif (c0 < 0x80 and c1 < 0x80 and c2 < 0x80):
-					c0 = c1 = c2 = 0x00
-				elif (c0 > 0x80 and c1 > 0x80 and c2 > 0x80):
-					c0 = c1 = c2 = 0xff
-				else:
-					c0 = c1 = c2 = 0xff
-				fi.putpixel((x,y),(c0,c1,c2))
-		
-		self.fb_fill()
-		self.img.paste(fi,(0,0))
+		# or dither image to these colors (dither: GDEWDither, None = mode from constructor).
+		# With frame cache planes of file shown before are taken from cache (no decoding).
+		# File with exactly 11616 bytes is raw planes (see fb_load_raw).
+		if (is_raw(fname)):
+			return self.fb_load_raw(fname)
+		if (dither is None):
+			dither = self.dither
+		key = None
+		if (self.frame_cache is not None):
+			key = self.frame_cache.key(fname, self.fb_load_settings(dither))
+			planes = self.frame_cache.get(key)
+			if (planes is not None):
+				self._img = None
+				self.fb.set_planes(*planes)
+				return
+		fi = convert_image(fname, dither, self.orient.width, self.orient.height)
+		# smaller image is placed on white
+		self._img = None
+		self.fb.from_pil(fi, self.orient)
+		if (key is not None):
+			self.frame_cache.put(key, self.fb.rw, self.fb.bw)
+	
+	# load raw planes file: R/W plane + B/W plane (11616 bytes), no decoding (and no PIL)
+	def fb_load_raw(self, fname):
+		self._img = None
+		self.fb.set_planes(*load_raw(fname))
+	
+	def fb_save_raw(self, fname):
+		save_raw(fname, *self.fb_planes())
+	
+	# fb_load conversion settings, part of frame cache key
+	def fb_load_settings(self, dither=GDEWDither.none):
+		return convert_settings(dither, self.orient.width, self.orient.height) + self.orient.settings()
 		
 	def fb_save(self, fname):
-		self.img.save(fname,"PNG",compress_level=6)
-	
-	# send image buffer to the display and perform display update
-	def fb_update(self):
-		# convert image to R/W + B/W lists
-		bw = []
-		rw = []
-		bytesTotal = 5808
-		imw = self.img.size[0] #width
-		imh = self.img.size[1] #height
-		#print("imh={} imw={}".format(imh,imw))
-		if (imh > self.WIDTH):
-			imh = self.WIDTH
-		if (imw > self.HEIGHT):
-			imw = self.HEIGHT
-		# load b/w
-		# load r/w
-		b1r = b1b = 0
-		mask = 0x80
-		bitpos=0
-		#print("imh={} imw={}".format(imh,imw))
-		for y in range(imh-1, -1, -1):
-			for x in range(0,imw):
-				pix = self.img.getpixel((x,y))
-				if (pix[0] > 0x80 and pix[1] < 0x80 and pix[2] < 0x80):
-					b1r = b1r | mask
-				elif (pix[0] < 0x80 and pix[1] < 0x80 and pix[2] < 0x80):
-					b1b = b1b | mask
-				#else:
-				#	red=no, black=no => white
-				#shift
-				mask = mask >> 1
-				bitpos = bitpos + 1
-				# if masked 8 bits
-				if (bitpos >= 8):
-					bw.append(b1b)
-					rw.append(b1r)
-					b1b=b1r=0
-					mask=0x80	
-					bitpos=0					
-			
-		# update display
+		im = self._img
+		if (im is None):
+			im = self.fb.to_pil(self.orient)
+		im.save(fname,"PNG",compress_level=6)
+	
+	# framebuffer as (rw, bw) planes
+	def fb_planes(self):
+		if (self._img is not None):
+			self.fb.from_pil(self._img, self.orient)
+		return self.fb.planes()
+	
+	# send planes to the display RAM (no display refresh), unchanged planes are not sent (force=1 send both)
+	# return 0 on success, 1 if planes are too small, 11/12 if write_rw failed, 21/22 if write_bw failed
+	def send_planes(self, rw, bw, force=0):
 		if (len(bw) < 5808 or len(rw) < 5808):
 			print("\033[31m" + "Red/White & Black/White lists have only: {} & {} elements.".format(len(rw),len(bw)))
 			return 1
 		ret=3
-		ret = self.write_rw(rw)
+		ret = self.write_rw(rw, force)
 		if (ret > 0):
 			return ret+10
 		
-		ret = self.write_bw(bw)
+		ret = self.write_bw(bw, force)
 		if (ret > 0):
 			return ret+20
-			
+		return 0
+	
+	# send image buffer to the display RAM (no display refresh), return same as send_planes
+	def fb_send(self, force=0):
+		return self.send_planes(*self.fb_planes(), force)
+	
+	# Streaming send of PIL image (None = self.img): planes are packed in chunks of
+	# chunkRows lines and a sender thread transmits each R/W chunk as soon as it is
+	# ready, so packing (of both planes) overlap with R/W plane transfer, B/W plane 
+	# is sent after. Both planes are always sent (no shadow check, data is not known
+	# before it is packed). Framebuffer is updated with the sent planes.
+	# Return (rw, bw).
+	def send_stream(self, img=None, chunkRows=16):
+		if (img is None):
+			img = self.img
+		t = self.phase_start()
+		q = queue.Queue()
+		err = []
+		def sender():
+			try:
+				while True:
+					item = q.get()
+					if (item is None):
+						break
+					if (isinstance(item, int)):
+						self.pin_dc_lo()
+						self.send_byte(item)
+						self.pin_dc_hi()
+					else:
+						self.io.write(item)
+			except Exception as ex:
+				err.append(ex)
+				# drain queue, so producer does not wait for nothing
+				while (q.get() is not None):
+					pass
+		self.ram = { 0x10: None, 0x13: None }
+		th = threading.Thread(target=sender, daemon=True)
+		th.start()
+		rw = bytearray()
+		bw = bytearray()
+		try:
+			q.put(0x13)
+			for crw, cbw in pack_rows(img, chunkRows, self.HEIGHT, self.WIDTH, self.orient):
+				q.put(crw)
+				rw.extend(crw)
+				bw.extend(cbw)
+			rw = bytes(rw)
+			bw = bytes(bw)
+			q.put(0x10)
+			q.put(bw)
+		finally:
+			q.put(None)
+			th.join()
+		if (len(err) > 0):
+			raise err[0]
+		self.phase_end("write_stream", t)
+		self.ram_dirty = 1
+		if (len(rw) != 5808 or len(bw) != 5808):
+			# controller RAM content is not known (self.ram stay None)
+			raise ValueError("streamed planes have {} & {} bytes (5808 expected)".format(len(rw), len(bw)))
+		self.ram = { 0x10: bw, 0x13: rw }
+		self._img = None
+		self.fb.set_planes(rw, bw)
+		self.shadow_stats["plane_sent"] += 2
+		return (rw, bw)
+	
+	# streaming send of image (see send_stream) + display refresh, return same as update()
+	def fb_update_stream(self, img=None, chunkRows=16, noWait=0):
+		self.send_stream(img, chunkRows)
+		return self.update(noWait)
+	
+	# Window (from dirty_window) for partial update with planes rw & bw, or None if full update 
+	# must be done: partial update is off, display RAM is unknown or not shown yet, 
+	# nothing changed or changed area is bigger than partialMax.
+	def partial_window(self, rw, bw, force=0):
+		if (force or self.partial_max <= 0 or self.ram_dirty):
+			return None
+		if (self.ram[0x13] is None or self.ram[0x10] is None or len(rw) != 5808 or len(bw) != 5808):
+			return None
+		win = dirty_window(self.ram[0x13], self.ram[0x10], rw, bw)
+		if (win is None):
+			return None
+		area = (win[1] - win[0] + 1) * (win[3] - win[2] + 1)
+		if (area > self.partial_max * 5808):
+			return None
+		return win
+	
+	# parameters of partial window commands (PDTM1/PDTM2/PDRF): 
+	#      P0,P1=X(bit8, bit7..3) P2,P3=Y(bit8, bit7..0) P4,P5=W(bit8, bit7..3) P6,P7=L(bit8, bit7..0)
+	# X/W are in pixels along 176px line (multiple of 8), Y/L in lines in plane order (bottom-up).
+	def window_param(self, win):
+		r0, r1, b0, b1 = win
+		x = b0 * 8
+		w = (b1 - b0 + 1) * 8
+		l = r1 - r0 + 1
+		return bytes([ (x>>8)&0x01, x&0xf8, (r0>>8)&0x01, r0&0xff, (w>>8)&0x01, w&0xf8, (l>>8)&0x01, l&0xff ])
+	
+	# write window of planes rw & bw to display RAM
+	def write_window(self, rw, bw, win):
+		p = self.window_param(win)
+		self.ram[0x10] = self.ram[0x13] = None
+		t = self.phase_start()
+		# partial B/W Data: CMD_PDTM1[0x14]
+		d = p + window_data(bw, win)
+		self.send_cmd2(0x14, len(d), d)
+		# partial R/W Data: CMD_PDTM2[0x15]
+		d = p + window_data(rw, win)
+		self.send_cmd2(0x15, len(d), d)
+		self.phase_end("write_window", t)
+		# outside of window RAM was same already
+		self.ram[0x10] = bytes(bw)
+		self.ram[0x13] = bytes(rw)
+		self.shadow_stats["plane_sent"] += 2
+	
+	# start partial refresh of window: CMD_PDRF[0x16] (set noWait to 1 to skip busy wait)
+	def update_window(self, win, noWait=0):
+		self.send_cmd2(0x16, 8, self.window_param(win))
+		self.ram_dirty = 0
+		self.shadow_stats["partial"] += 1
+		if (noWait==0):
+			t = self.phase_start()
+			self.busy_wait()
+			self.phase_end("partial_wait", t)
+	
+	# send image buffer to the display and perform display update.
+	# When display already show this image (no plane changed since last refresh) 
+	# refresh is skipped, set force=1 to send planes and refresh anyway.
+	# When only small area changed (see partialMax) only that window is sent and refreshed.
+	# Set noWait to 1 to return right after refresh is started (see busy_wait).
+	# return 0 on success, -1 if refresh was skipped or send_planes error code
+	def fb_update(self, force=0, noWait=0):
+		return self.planes_update(*self.fb_planes(), force, noWait)
+	
+	# fb_update of planes (rw, bw) given by caller, framebuffer is not used
+	def planes_update(self, rw, bw, force=0, noWait=0):
+		win = self.partial_window(rw, bw, force)
+		if (win is not None):
+			self.write_window(rw, bw, win)
+			self.update_window(win, noWait)
+			return 0
+		ret = self.send_planes(rw, bw, force)
+		if (ret > 0):
+			return ret
+		if (force == 0 and self.ram_dirty == 0):
+			self.shadow_stats["refresh_skips"] += 1
+			return -1
 		# start display update
-		self.update()
-		#end.
\ No newline at end of file
+		self.update(noWait)
+		return 0
+	
+	# ****** ASYNCIO API ********
+	# Same as sync versions, but SPI transfers are done in executor thread and BUSY 
+	# is awaited (GPIO edge event), so event loop can do other things while 
+	# display refresh. Async calls on one display are serialized.
+	# timeout is for BUSY wait (None = busyTimeout from constructor), cancelling 
+	# task during transfer keep display locked until transfer thread ends.
+	
+	def async_lock(self):
+		import asyncio
+		if (self.alock is None):
+			self.alock = asyncio.Lock()
+		return self.alock
+	
+	# run blocking function in executor thread
+	async def run_in_thread(self, fn, *args):
+		import asyncio
+		fut = asyncio.get_running_loop().run_in_executor(None, fn, *args)
+		try:
+			return await asyncio.shield(fut)
+		except asyncio.CancelledError:
+			# SPI transfer can't be interrupted, wait for it before display is unlocked
+			while (fut.done() == False):
+				try:
+					await asyncio.wait([fut])
+				except asyncio.CancelledError:
+					pass
+			raise
+	
+	# await BUSY release, return time spent on waiting in seconds (also stored in self.busy_time)
+	async def busy_wait_async(self, timeout=None):
+		import asyncio
+		if (timeout is None):
+			timeout = self.busy_timeout
+		t0 = time.monotonic()
+		if (self.pin_get_bsy() == 1):
+			self.busy_time = 0.0
+			return self.busy_time
+		loop = asyncio.get_running_loop()
+		released = asyncio.Event()
+		# callback is called from RPi.GPIO thread
+		self.io.bsy_event_on(lambda pin: loop.call_soon_threadsafe(released.set))
+		try:
+			# edge can come before event detect was enabled, so check pin at least every 1s
+			while self.pin_get_bsy() == 0:
+				left = 1.0
+				if (timeout):
+					left = timeout - (time.monotonic() - t0)
+					if (left <= 0):
+						self.busy_time = time.monotonic() - t0
+						raise GDEWBusyTimeout("BUSY not released after {:.3f}s (timeout {}s)".format(self.busy_time, timeout))
+				try:
+					await asyncio.wait_for(released.wait(), min(left, 1.0))
+				except asyncio.TimeoutError:
+					pass
+				released.clear()
+		finally:
+			self.io.bsy_event_off()
+		self.busy_time = time.monotonic() - t0
+		return self.busy_time
+	
+	async def _update_async(self, noWait, timeout):
+		r = await self.run_in_thread(self.update, 1)
+		if (noWait == 0):
+			t = self.phase_start()
+			await self.busy_wait_async(timeout)
+			self.phase_end("refresh_wait", t)
+		return r
+	
+	# async version of update(), same arguments (timeout is keyword only)
+	async def update_async(self, noWait=0, *, timeout=None):
+		async with self.async_lock():
+			return await self._update_async(noWait, timeout)
+	
+	# async version of fb_update(), force as in fb_update (timeout is keyword only)
+	async def fb_update_async(self, force=0, *, timeout=None):
+		async with self.async_lock():
+			rw, bw = self.fb_planes()
+			win = self.partial_window(rw, bw, force)
+			if (win is not None):
+				await self.run_in_thread(self.write_window, rw, bw, win)
+				await self.run_in_thread(self.update_window, win, 1)
+				t = self.phase_start()
+				await self.busy_wait_async(timeout)
+				self.phase_end("partial_wait", t)
+				return 0
+			ret = await self.run_in_thread(self.send_planes, rw, bw, force)
+			if (ret > 0):
+				return ret
+			if (force == 0 and self.ram_dirty == 0):
+				self.shadow_stats["refresh_skips"] += 1
+				return -1
+			await self._update_async(0, timeout)
+			return 0
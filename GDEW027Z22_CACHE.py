@@ -0,0 +1,161 @@
+#!/usr/bin/python3
+
+#******************************************************************************
+# Name        : On-disk cache of converted frames for E-INK GDEW027Z22
+#
+# Description : Keep R/W + B/W planes of images already converted by fb_load
+#               (decode + thumbnail + quantization + packing), so showing the
+#               same file again is a plain copy of 11616 bytes from the cache.
+#               Cache is one file of fixed-size records, memory-mapped:
+#                 header  : magic[8] records[4] record_size[4] tick[8]
+#                 record  : key[16] tick[8] flags[8] rw[5808] bw[5808]
+#               key is hash of: absolute path, mtime, size, conversion
+#               settings. tick is taken from header counter on each hit or
+#               store, when all records are used the one with lowest tick
+#               is replaced (LRU). File is locked (flock) while used, so it
+#               can be shared by many processes (CLI runs).
+#
+# Date        : 2026-10-18
+# License     : Beerware (rv.42) - Google for it.
+#
+# Changelog   :
+#               - 0.1 - Initial version
+#******************************************************************************
+
+import os
+import mmap
+import fcntl
+import struct
+import hashlib
+from GDEW027Z22_FB import PLANE_SIZE
+
+CACHE_MAGIC=b"GDEWFC01"
+CACHE_HDR=struct.Struct("<8sIIQ")
+CACHE_REC=struct.Struct("<16sQQ")
+CACHE_REC_SIZE=CACHE_REC.size + 2*PLANE_SIZE
+
+# default cache file: $XDG_CACHE_HOME/GDEW027Z22.frames (~/.cache/...)
+def default_cache_path():
+	base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+	return os.path.join(base, "GDEW027Z22.frames")
+
+# Cache of converted frames, maxEntries records (~11.4kB each) in file path.
+# File with other record count/layout is recreated (so all processes sharing
+# the file must use the same maxEntries).
+class GDEWFrameCache:
+	def __init__(self, path=None, maxEntries=64):
+		if (path is None):
+			path = default_cache_path()
+		self.path = path
+		self.max_entries = maxEntries
+		self.hits = 0
+		self.misses = 0
+		d = os.path.dirname(path)
+		if (d):
+			os.makedirs(d, exist_ok=True)
+		size = CACHE_HDR.size + maxEntries * CACHE_REC_SIZE
+		self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+		fcntl.flock(self.fd, fcntl.LOCK_EX)
+		try:
+			hdr = os.pread(self.fd, CACHE_HDR.size, 0)
+			ok = False
+			if (len(hdr) == CACHE_HDR.size and os.fstat(self.fd).st_size == size):
+				magic, n, rs, tick = CACHE_HDR.unpack(hdr)
+				ok = (magic == CACHE_MAGIC and n == maxEntries and rs == CACHE_REC_SIZE)
+			if (not ok):
+				os.ftruncate(self.fd, 0)
+				os.ftruncate(self.fd, size)
+				os.pwrite(self.fd, CACHE_HDR.pack(CACHE_MAGIC, maxEntries, CACHE_REC_SIZE, 0), 0)
+			self.mm = mmap.mmap(self.fd, size)
+		finally:
+			fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+	def close(self):
+		if (self.mm is not None):
+			self.mm.close()
+			self.mm = None
+			os.close(self.fd)
+
+	def __del__(self):
+		if (getattr(self, "mm", None) is not None):
+			self.close()
+
+	# cache key of file (None when file can't be stat'ed)
+	def key(self, fname, settings=""):
+		try:
+			st = os.stat(fname)
+		except OSError:
+			return None
+		k = "{}\0{}\0{}\0{}".format(os.path.abspath(fname), st.st_mtime_ns, st.st_size, settings)
+		return hashlib.blake2b(k.encode(), digest_size=16).digest()
+
+	def next_tick(self):
+		magic, n, rs, tick = CACHE_HDR.unpack_from(self.mm, 0)
+		tick = tick + 1
+		CACHE_HDR.pack_into(self.mm, 0, magic, n, rs, tick)
+		return tick
+
+	def rec_offset(self, i):
+		return CACHE_HDR.size + i * CACHE_REC_SIZE
+
+	# record index holding key or None
+	def find(self, key):
+		for i in range(0, self.max_entries):
+			o = self.rec_offset(i)
+			if (self.mm[o:o+16] == key and CACHE_REC.unpack_from(self.mm, o)[2] & 1):
+				return i
+		return None
+
+	# return (rw, bw) planes or None
+	def get(self, key):
+		if (key is None):
+			return None
+		fcntl.flock(self.fd, fcntl.LOCK_EX)
+		try:
+			i = self.find(key)
+			if (i is None):
+				self.misses += 1
+				return None
+			o = self.rec_offset(i)
+			CACHE_REC.pack_into(self.mm, o, key, self.next_tick(), 1)
+			o = o + CACHE_REC.size
+			self.hits += 1
+			return (self.mm[o:o+PLANE_SIZE], self.mm[o+PLANE_SIZE:o+2*PLANE_SIZE])
+		finally:
+			fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+	# store planes, replace same key, free record or least recently used one
+	def put(self, key, rw, bw):
+		if (key is None or len(rw) != PLANE_SIZE or len(bw) != PLANE_SIZE):
+			return
+		fcntl.flock(self.fd, fcntl.LOCK_EX)
+		try:
+			i = self.find(key)
+			if (i is None):
+				oldest = None
+				for j in range(0, self.max_entries):
+					k, tick, flags = CACHE_REC.unpack_from(self.mm, self.rec_offset(j))
+					if ((flags & 1) == 0):
+						i = j
+						break
+					if (oldest is None or tick < oldest):
+						oldest = tick
+						i = j
+			o = self.rec_offset(i)
+			# invalidate record while it is rewritten
+			CACHE_REC.pack_into(self.mm, o, key, 0, 0)
+			self.mm[o+CACHE_REC.size : o+CACHE_REC.size+PLANE_SIZE] = rw
+			self.mm[o+CACHE_REC.size+PLANE_SIZE : o+CACHE_REC_SIZE] = bw
+			CACHE_REC.pack_into(self.mm, o, key, self.next_tick(), 1)
+		finally:
+			fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+	# drop all entries
+	def clear(self):
+		fcntl.flock(self.fd, fcntl.LOCK_EX)
+		try:
+			for i in range(0, self.max_entries):
+				o = self.rec_offset(i)
+				CACHE_REC.pack_into(self.mm, o, bytes(16), 0, 0)
+		finally:
+			fcntl.flock(self.fd, fcntl.LOCK_UN)
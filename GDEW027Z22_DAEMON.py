@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+
+#******************************************************************************
+# Name        : Display daemon for E-INK GDEW027Z22 2,7" R/B/W
+#
+# Description : Keep initialized driver open and take requests over a Unix
+#               domain socket, so showing an image cost only conversion and
+#               refresh (no python start-up, imports, reset, init).
+#               Protocol (one request per connection):
+#                 client: JSON line {"cmd": ...} + "\n" [+ "size" raw bytes]
+#                 daemon: JSON line {"ok": true/false, "result", "time", "error"}
+#               Commands:
+#                 show   - "path" image file, optional "dither" (default: mode
+#                          of daemon driver), "force"
+#                 planes - raw planes (size=11616: R/W then B/W), optional "force"
+#                 clear  - white screen
+#                 sleep  - power off + deep sleep (next request wake it up)
+#                 stats  - driver counters
+#                 quit   - stop daemon
+#               Client part (daemon_request) import nothing from driver, PIL
+#               or GPIO, so thin client start fast.
+#
+# Date        : 2026-10-18
+# License     : Beerware (rv.42) - Google for it.
+#
+# Changelog   :
+#               - 0.1 - Initial version
+#               - 0.2 - no tempfile import (client start-up time)
+#******************************************************************************
+
+import os
+import json
+import time
+import socket
+from GDEW027Z22_FB import PLANE_SIZE, RAW_SIZE
+
+# default socket: $XDG_RUNTIME_DIR/GDEW027Z22.sock (or in $TMPDIR, /tmp)
+def default_socket_path():
+	return os.path.join(os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp", "GDEW027Z22.sock")
+
+def recv_line(conn, limit=65536):
+	buf = bytearray()
+	while (len(buf) < limit):
+		b = conn.recv(1)
+		if (len(b) == 0 or b == b"\n"):
+			break
+		buf.extend(b)
+	return bytes(buf)
+
+def recv_exact(conn, n):
+	buf = bytearray()
+	while (len(buf) < n):
+		b = conn.recv(min(65536, n - len(buf)))
+		if (len(b) == 0):
+			raise ConnectionError("connection closed after {} of {} bytes".format(len(buf), n))
+		buf.extend(b)
+	return bytes(buf)
+
+# Send request to daemon, return response dict.
+# Raise OSError (e.g. ConnectionRefusedError, FileNotFoundError) when daemon is not running.
+def daemon_request(req, payload=None, path=None, timeout=120.0):
+	if (path is None):
+		path = default_socket_path()
+	req = dict(req)
+	if (payload is not None):
+		req["size"] = len(payload)
+	s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	try:
+		s.settimeout(timeout)
+		s.connect(path)
+		s.sendall(json.dumps(req).encode() + b"\n")
+		if (payload is not None):
+			s.sendall(payload)
+		return json.loads(recv_line(s).decode())
+	finally:
+		s.close()
+
+# Daemon serving one GDEW027Z22 driver (eink) on Unix socket path.
+# Requests are handled one after other (driver is not shared).
+class GDEWDaemon:
+	def __init__(self, eink, path=None, mode=0o660):
+		if (path is None):
+			path = default_socket_path()
+		self.eink = eink
+		self.path = path
+		self.asleep = 0
+		self.running = 0
+		self.requests = 0
+		# remove stale socket (bind fail if file exists)
+		try:
+			os.remove(path)
+		except FileNotFoundError:
+			pass
+		self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		self.sock.bind(path)
+		os.chmod(path, mode)
+		self.sock.listen(4)
+
+	def close(self):
+		if (self.sock is not None):
+			self.sock.close()
+			self.sock = None
+			try:
+				os.remove(self.path)
+			except OSError:
+				pass
+
+	# serve until quit request (or exception, e.g. KeyboardInterrupt)
+	def serve(self):
+		self.running = 1
+		try:
+			while (self.running):
+				conn, addr = self.sock.accept()
+				try:
+					conn.settimeout(30.0)
+					self.handle(conn)
+				except Exception as ex:
+					print("\033[31m" + "Request failed: {}".format(ex) + "\033[0m")
+				finally:
+					conn.close()
+		finally:
+			self.close()
+
+	def handle(self, conn):
+		req = json.loads(recv_line(conn).decode())
+		payload = None
+		if ("size" in req):
+			payload = recv_exact(conn, int(req["size"]))
+		t0 = time.monotonic()
+		resp = { "ok": True }
+		try:
+			resp["result"] = self.execute(req, payload)
+		except Exception as ex:
+			resp = { "ok": False, "error": "{}: {}".format(type(ex).__name__, ex) }
+		resp["time"] = time.monotonic() - t0
+		self.requests += 1
+		conn.sendall(json.dumps(resp).encode() + b"\n")
+
+	# wake controller up after sleep request
+	def wake(self):
+		if (self.asleep):
+			self.eink.reset()
+			self.asleep = 0
+
+	def execute(self, req, payload):
+		cmd = req.get("cmd")
+		e = self.eink
+		force = int(req.get("force", 0))
+		if (cmd == "show"):
+			self.wake()
+			e.fb_load(req["path"], req.get("dither"))
+			return e.fb_update(force)
+		if (cmd == "planes"):
+			if (payload is None or len(payload) != RAW_SIZE):
+				raise ValueError("planes need 11616 bytes (R/W + B/W)")
+			self.wake()
+			e.img = None
+			e.fb.set_planes(payload[:PLANE_SIZE], payload[PLANE_SIZE:])
+			return e.fb_update(force)
+		if (cmd == "clear"):
+			self.wake()
+			e.fb_fill()
+			return e.fb_update(force)
+		if (cmd == "sleep"):
+			if (self.asleep == 0):
+				e.shutdown()
+				e.deep_sleep()
+				self.asleep = 1
+			return 0
+		if (cmd == "stats"):
+			r = { "requests": self.requests, "asleep": self.asleep, "shadow": dict(e.shadow_stats) }
+			if (e.stats is not None):
+				r["stats"] = e.stats.as_dict()
+			return r
+		if (cmd == "quit"):
+			self.running = 0
+			return 0
+		raise ValueError("unknown command: {}".format(cmd))
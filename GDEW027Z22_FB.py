@@ -0,0 +1,707 @@
+#!/usr/bin/python3
+
+#******************************************************************************
+# Name        : Framebuffer helpers for E-INK GDEW027Z22 2,7" R/B/W
+#
+# Description : Conversion between PIL images and the two native bitplanes
+#               of the EK79652 controller (DTM1 black/white, DTM2 red/white).
+#               Each plane is 5808 bytes: 264 rows * 22 bytes, rows are
+#               sent bottom-up, MSB first, x from left to right.
+#               Red have priority over black.
+#               NumPy is used when available, otherwise a (slow) pure
+#               python loop is used.
+#               GDEWFrameBuffer keeps frame directly as the two planes.
+#               Dithering to red/black/white palette: ordered (Bayer 8x8) and
+#               error diffusion (Floyd-Steinberg).
+#               GDEWOrientation - rotated / mirrored image on the panel: one
+#               PIL transpose before packing with NumPy, precomputed pixel
+#               permutation in the pure python packing loop.
+#
+# Date        : 2026-10-18
+# License     : Beerware (rv.42) - Google for it.
+#
+# Changelog   :
+#               - 0.1 - Initial version
+#               - 0.2 - GDEWFrameBuffer (bit-packed two plane framebuffer)
+#               - 0.3 - dithering
+#               - 0.4 - NumPy is imported on first use, raw planes files
+#               - 0.5 - orientation (rotation, mirror)
+#               - 0.6 - NumPy packing of rotated image use PIL transpose (faster
+#                       than permutation gathers, see bench.py pack_rot90)
+#******************************************************************************
+
+import os
+
+# NumPy is imported on first use (it take long time on Pi Zero and is not
+# needed when only ready planes are shown). numpy is None when not installed.
+numpy = None
+numpy_loaded = 0
+
+def use_numpy():
+	global numpy, numpy_loaded
+	if (numpy_loaded == 0):
+		numpy_loaded = 1
+		try:
+			import numpy
+		except ImportError:
+			numpy = None
+	return numpy
+
+PLANE_SIZE=5808
+
+# raw planes file: R/W plane followed by B/W plane (11616 bytes), no header
+RAW_SIZE=2*PLANE_SIZE
+
+def load_raw(fname):
+	with open(fname, "rb") as f:
+		raw = f.read(RAW_SIZE + 1)
+	if (len(raw) != RAW_SIZE):
+		raise ValueError("{}: raw planes file must have {} bytes".format(fname, RAW_SIZE))
+	return (raw[:PLANE_SIZE], raw[PLANE_SIZE:])
+
+def save_raw(fname, rw, bw):
+	with open(fname, "wb") as f:
+		f.write(bytes(rw) + bytes(bw))
+
+# signatures of image files (PNG, BMP, JPEG, GIF, TIFF, WebP/RIFF, PNM)
+IMAGE_MAGIC = (b"\x89PNG", b"BM", b"\xff\xd8\xff", b"GIF8", b"II*\x00", b"MM\x00*", b"RIFF", b"P1", b"P2", b"P3", b"P4", b"P5", b"P6")
+
+# file is raw planes: 11616 bytes and ".raw" extension or not starting with
+# signature of an image (image which is 11616 bytes long is not taken as raw)
+def is_raw(fname):
+	if (os.path.getsize(fname) != RAW_SIZE):
+		return False
+	if (fname.lower().endswith(".raw")):
+		return True
+	with open(fname, "rb") as f:
+		head = f.read(8)
+	return head.startswith(IMAGE_MAGIC) == False
+
+# Convert image to R/W + B/W planes, reference (pixel by pixel) version.
+# Return tuple (rw, bw) of bytes.
+def pack_planes_loop(img, width=176, height=264):
+	bw = bytearray()
+	rw = bytearray()
+	imw = img.size[0] #width
+	imh = img.size[1] #height
+	if (imh > height):
+		imh = height
+	if (imw > width):
+		imw = width
+	b1r = b1b = 0
+	mask = 0x80
+	bitpos=0
+	for y in range(imh-1, -1, -1):
+		for x in range(0,imw):
+			pix = img.getpixel((x,y))
+			if (pix[0] > 0x80 and pix[1] < 0x80 and pix[2] < 0x80):
+				b1r = b1r | mask
+			elif (pix[0] < 0x80 and pix[1] < 0x80 and pix[2] < 0x80):
+				b1b = b1b | mask
+			#else:
+			#	red=no, black=no => white
+			#shift
+			mask = mask >> 1
+			bitpos = bitpos + 1
+			# if masked 8 bits
+			if (bitpos >= 8):
+				bw.append(b1b)
+				rw.append(b1r)
+				b1b=b1r=0
+				mask=0x80
+				bitpos=0
+	return (bytes(rw), bytes(bw))
+
+# Convert image to R/W + B/W planes in one pass over the whole image.
+# Same thresholds and byte layout as pack_planes_loop: rows bottom-up,
+# red[r>0x80,g<0x80,b<0x80] / black[r,g,b<0x80] / anything else is white.
+# Return tuple (rw, bw) of bytes (5808 bytes each for full size image).
+def pack_planes(img, width=176, height=264, orient=None):
+	if (orient is not None and orient.perm is not None):
+		return pack_planes_orient(img, orient)
+	if (use_numpy() is None):
+		return pack_planes_loop(img, width, height)
+	if (img.mode != "RGB"):
+		img = img.convert("RGB")
+	a = numpy.asarray(img)[:height, :width]
+	# bottom-up row order
+	a = a[::-1]
+	r = a[:,:,0]
+	low = (a[:,:,1] < 0x80) & (a[:,:,2] < 0x80)
+	red = (r > 0x80) & low
+	black = (r < 0x80) & low
+	# bits do not restart at row end, incomplete last byte is dropped
+	n = (red.size // 8) * 8
+	rw = numpy.packbits(red.reshape(-1)[:n])
+	bw = numpy.packbits(black.reshape(-1)[:n])
+	return (rw.tobytes(), bw.tobytes())
+
+# Image (orient.width x orient.height) to planes. With NumPy image is turned to
+# native orientation by one PIL transpose and packed as native image (measured
+# faster than gathers of channels through orient.perm, see bench.py pack_rot90),
+# without it pixels are taken in plane order through orient.perm.
+def pack_planes_orient(img, orient):
+	if (use_numpy() is not None):
+		return pack_planes(orient_native(img, orient), orient.native_width, orient.native_height)
+	return pack_planes_orient_loop(img, orient)
+
+# Image fitted to orient.width x orient.height and transposed to native orientation
+def orient_native(img, orient):
+	from PIL import Image
+	return fit_image(img, orient.width, orient.height).transpose(getattr(Image, orient.transpose))
+
+# pack_planes_orient without NumPy (reference, rotation folded into packing loop)
+def pack_planes_orient_loop(img, orient):
+	return tuple(b"".join(p) for p in zip(*pack_rows_orient_loop(img, orient, orient.native_height)))
+
+# Generator of planes chunks (rows native lines each) of image in orientation orient
+def pack_rows_orient(img, orient, rows=16):
+	if (use_numpy() is not None):
+		yield from pack_rows(orient_native(img, orient), rows, orient.native_width, orient.native_height)
+		return
+	yield from pack_rows_orient_loop(img, orient, rows)
+
+def pack_rows_orient_loop(img, orient, rows=16):
+	img = fit_image(img, orient.width, orient.height)
+	perm = orient.perm
+	pix = list(img.getdata())
+	for y in range(0, orient.native_height, rows):
+		rw = bytearray()
+		bw = bytearray()
+		for i in range(y * orient.native_width, min(y + rows, orient.native_height) * orient.native_width, 8):
+			b1r = b1b = 0
+			mask = 0x80
+			for k in range(i, i + 8):
+				p = pix[perm[k]]
+				if (p[0] > 0x80 and p[1] < 0x80 and p[2] < 0x80):
+					b1r = b1r | mask
+				elif (p[0] < 0x80 and p[1] < 0x80 and p[2] < 0x80):
+					b1b = b1b | mask
+				mask = mask >> 1
+			rw.append(b1r)
+			bw.append(b1b)
+		yield (bytes(rw), bytes(bw))
+
+# Generator of planes of image in chunks of rows lines (in send order: bottom-up),
+# yield tuples (rw, bw) of bytes, same thresholds as pack_planes. Joined chunks
+# are equal to pack_planes result of image fitted to width x height (width
+# must be multiple of 8).
+def pack_rows(img, rows=16, width=176, height=264, orient=None):
+	if (orient is not None and orient.perm is not None):
+		yield from pack_rows_orient(img, orient, rows)
+		return
+	# smaller image is placed on white, bigger is clipped (as from_pil)
+	img = fit_image(img, width, height)
+	imw = width
+	imh = height
+	a = None
+	if (use_numpy() is not None):
+		a = numpy.asarray(img)
+	for y1 in range(imh, 0, -rows):
+		y0 = max(0, y1 - rows)
+		if (a is not None):
+			c = a[y0:y1, :imw][::-1]
+			r = c[:,:,0]
+			low = (c[:,:,1] < 0x80) & (c[:,:,2] < 0x80)
+			yield (numpy.packbits((r > 0x80) & low, axis=1).tobytes(), numpy.packbits((r < 0x80) & low, axis=1).tobytes())
+			continue
+		rw = bytearray()
+		bw = bytearray()
+		for y in range(y1-1, y0-1, -1):
+			b1r = b1b = 0
+			mask = 0x80
+			for x in range(0, imw):
+				pix = img.getpixel((x,y))
+				if (pix[0] > 0x80 and pix[1] < 0x80 and pix[2] < 0x80):
+					b1r = b1r | mask
+				elif (pix[0] < 0x80 and pix[1] < 0x80 and pix[2] < 0x80):
+					b1b = b1b | mask
+				mask = mask >> 1
+				if (mask == 0):
+					rw.append(b1r)
+					bw.append(b1b)
+					b1r = b1b = 0
+					mask = 0x80
+		yield (bytes(rw), bytes(bw))
+
+# Snap image colors to red/black/white, reference (pixel by pixel) version.
+# red[r>=0x80,g<0x80,b<0x80] => 0xff0000, black[r,g,b<0x80] => 0x000000,
+# anything else => 0xffffff. Return new RGB image.
+def quantize_loop(img):
+	fi = img.convert("RGB")
+	for x in range(0, fi.size[0]):
+		for y in range(0,fi.size[1]):
+			c = fi.getpixel((x,y))
+			c0 = c[0]
+			c1 = c[1]
+			c2 = c[2]
+			if (c0 >= 0x80 and c1 < 0x80 and c2 < 0x80):
+				c0 = 0xff
+				c1 = c2 = 0
+			elif (c0 < 0x80 and c1 < 0x80 and c2 < 0x80):
+				c0 = c1 = c2 = 0x00
+			elif (c0 > 0x80 and c1 > 0x80 and c2 > 0x80):
+				c0 = c1 = c2 = 0xff
+			else:
+				c0 = c1 = c2 = 0xff
+			fi.putpixel((x,y),(c0,c1,c2))
+	return fi
+
+# Snap image colors to red/black/white over the whole image at once.
+# Same thresholds as quantize_loop, accept any PIL mode (L, RGBA, P, ...).
+# Return new RGB image.
+def quantize(img):
+	if (use_numpy() is None):
+		return quantize_loop(img)
+	from PIL import Image
+	a = numpy.asarray(img.convert("RGB"))
+	# red and black both have g,b=0 - only black have r=0
+	low = (a[:,:,1] < 0x80) & (a[:,:,2] < 0x80)
+	black = low & (a[:,:,0] < 0x80)
+	out = numpy.empty(a.shape, numpy.uint8)
+	out[:,:,0] = numpy.where(black, 0x00, 0xff)
+	out[:,:,1] = out[:,:,2] = numpy.where(low, 0x00, 0xff)
+	return Image.fromarray(out, "RGB")
+
+# dithering modes for fb_load
+class GDEWDither:
+	none=0
+	bayer=1
+	fs=2
+
+# display palette (index: GDEWColor white=0, black=1, red=2)
+PALETTE = [ (0xff,0xff,0xff), (0x00,0x00,0x00), (0xff,0x00,0x00) ]
+
+# 8x8 Bayer matrix
+BAYER8 = [
+	[  0, 32,  8, 40,  2, 34, 10, 42 ],
+	[ 48, 16, 56, 24, 50, 18, 58, 26 ],
+	[ 12, 44,  4, 36, 14, 46,  6, 38 ],
+	[ 60, 28, 52, 20, 62, 30, 54, 22 ],
+	[  3, 35, 11, 43,  1, 33,  9, 41 ],
+	[ 51, 19, 59, 27, 49, 17, 57, 25 ],
+	[ 15, 47,  7, 39, 13, 45,  5, 37 ],
+	[ 63, 31, 55, 23, 61, 29, 53, 21 ]
+]
+
+# palette index nearest (RGB distance) to color, first one wins on tie.
+# For this palette distances reduce to: white is nearest when r+g+b >= 382.5
+# and g+b >= 255, else black when r <= 127.5, else red.
+def nearest_loop(r, g, b):
+	if (r + g + b >= 382.5 and g + b >= 255.0):
+		return 0
+	if (r <= 127.5):
+		return 1
+	return 2
+
+# same as nearest_loop for arrays of r, g, b
+def nearest(r, g, b):
+	gb = g + b
+	return numpy.where((r + gb >= 382.5) & (gb >= 255.0), 0, numpy.where(r <= 127.5, 1, 2))
+
+# palette image from index array (numpy) or list of rows (loop versions)
+def palette_image(idx, w, h):
+	from PIL import Image
+	if (use_numpy() is not None and not isinstance(idx, list)):
+		return Image.fromarray(numpy.array(PALETTE, numpy.uint8)[idx], "RGB")
+	im = Image.new("RGB", (w, h))
+	im.putdata([ PALETTE[i] for row in idx for i in row ])
+	return im
+
+# Ordered dithering, reference (pixel by pixel) version. Return new RGB image.
+def dither_bayer_loop(img, spread=255.0):
+	fi = img.convert("RGB")
+	w, h = fi.size
+	idx = []
+	for y in range(0, h):
+		row = []
+		for x in range(0, w):
+			c = fi.getpixel((x,y))
+			t = ((BAYER8[y & 7][x & 7] + 0.5) / 64.0 - 0.5) * spread
+			row.append(nearest_loop(c[0] + t, c[1] + t, c[2] + t))
+		idx.append(row)
+	return palette_image(idx, w, h)
+
+# Ordered dithering (Bayer 8x8) to display palette, whole image at once.
+# spread: amplitude of threshold pattern (255 = full range).
+# Return new RGB image with palette colors only.
+def dither_bayer(img, spread=255.0):
+	if (use_numpy() is None):
+		return dither_bayer_loop(img, spread)
+	a = numpy.asarray(img.convert("RGB"), numpy.float64)
+	h, w = a.shape[:2]
+	m = (numpy.array(BAYER8, numpy.float64) + 0.5) / 64.0 - 0.5
+	t = numpy.tile(m, ((h + 7) // 8, (w + 7) // 8))[:h, :w] * spread
+	return palette_image(nearest(a[:,:,0] + t, a[:,:,1] + t, a[:,:,2] + t), w, h)
+
+# Floyd-Steinberg weights
+FS_R = 7.0/16.0
+FS_DL = 3.0/16.0
+FS_D = 5.0/16.0
+FS_DR = 1.0/16.0
+
+# Floyd-Steinberg error diffusion, reference (pixel by pixel) version.
+# Return new RGB image.
+def dither_fs_loop(img):
+	fi = img.convert("RGB")
+	w, h = fi.size
+	# error buffer with one column of padding on both sides and one extra row
+	buf = [ [ [0.0, 0.0, 0.0] for x in range(0, w+2) ] for y in range(0, h+1) ]
+	for y in range(0, h):
+		for x in range(0, w):
+			c = fi.getpixel((x,y))
+			p = buf[y][x+1]
+			p[0] = p[0] + c[0]
+			p[1] = p[1] + c[1]
+			p[2] = p[2] + c[2]
+	idx = []
+	for y in range(0, h):
+		row = []
+		for x in range(0, w):
+			p = buf[y][x+1]
+			i = nearest_loop(p[0], p[1], p[2])
+			row.append(i)
+			for k in range(0, 3):
+				e = p[k] - PALETTE[i][k]
+				buf[y+1][x][k] += e * FS_DL
+				buf[y+1][x+1][k] += e * FS_D
+				buf[y+1][x+2][k] += e * FS_DR
+				buf[y][x+2][k] += e * FS_R
+		idx.append(row)
+	return palette_image(idx, w, h)
+
+# Floyd-Steinberg error diffusion to display palette.
+# Pixel (x,y) needs error from (x-1,y), (x-1..x+1,y-1) only, so all pixels with
+# same t=x+2y (a "wavefront", up to 88 pixels) are done in one array operation:
+# ~700 steps for whole frame instead of 46464 pixels. Rows are stored skewed
+# (pixel x,y at column t) so wavefront and its neighbours are plain slices.
+# Result is same as dither_fs_loop. Return new RGB image with palette colors only.
+def dither_fs(img):
+	if (use_numpy() is None):
+		return dither_fs_loop(img)
+	a = numpy.asarray(img.convert("RGB"), numpy.float64)
+	h, w = a.shape[:2]
+	n = w + 2*h + 2
+	s = numpy.zeros((h+1, n, 3), numpy.float64)
+	for y in range(0, h):
+		s[y, 2*y:2*y+w] = a[y]
+	pal = numpy.array(PALETTE, numpy.float64)
+	si = numpy.zeros((h, n), numpy.intp)
+	for t in range(0, w + 2*(h-1)):
+		y0 = max(0, (t - w + 2) // 2)
+		y1 = min(h-1, t // 2) + 1
+		p = s[y0:y1, t]
+		i = nearest(p[:,0], p[:,1], p[:,2])
+		si[y0:y1, t] = i
+		e = p - pal[i]
+		# (x-1,y+1), (x,y+1), (x+1,y+1) are at t+1..t+3 in next row, (x+1,y) at t+1.
+		# Same order of adding as in dither_fs_loop (row above first).
+		s[y0+1:y1+1, t+1] += e * FS_DL
+		s[y0+1:y1+1, t+2] += e * FS_D
+		s[y0+1:y1+1, t+3] += e * FS_DR
+		s[y0:y1, t+1] += e * FS_R
+	ys = numpy.arange(h)[:,None]
+	return palette_image(si[ys, numpy.arange(w)[None,:] + 2*ys], w, h)
+
+# dither image with mode (GDEWDither), none returns image as is
+def dither_image(img, mode):
+	if (mode == GDEWDither.bayer):
+		return dither_bayer(img)
+	if (mode == GDEWDither.fs):
+		return dither_fs(img)
+	return img
+
+# Open image file and convert it to red/black/white (PIL RGB image), bigger
+# image is shrinked to width x height: drawings (dither none) without
+# filtering and quantized, photos with filtering and dithered.
+def convert_image(fname, dither=GDEWDither.none, width=176, height=264):
+	from PIL import Image
+	fi = Image.open(fname)
+	if (fi.size[0] > width or fi.size[1] > height):
+		fi.thumbnail((width,height), Image.NEAREST if dither == GDEWDither.none else Image.LANCZOS)
+	if (dither == GDEWDither.none):
+		return quantize(fi)
+	return dither_image(fi.convert("RGB"), dither)
+
+# convert_image settings as text (e.g. part of frame cache key)
+def convert_settings(dither=GDEWDither.none, width=176, height=264):
+	if (dither == GDEWDither.none):
+		return "thumbnail=nearest;quantize=0x80;{}x{}".format(width, height)
+	return "thumbnail=lanczos;dither={};{}x{}".format(dither, width, height)
+
+# Find changed area between old and new planes. Window is in plane (native)
+# layout: rows as sent to controller (row 0 is bottom line of image) and
+# whole bytes in row (8 pixels each).
+# Return tuple (row_first, row_last, byte_first, byte_last) or None if planes are same.
+def dirty_window(old_rw, old_bw, rw, bw, row_bytes=22):
+	if (use_numpy() is None):
+		rows = []
+		cols = []
+		for i in range(0, len(rw), row_bytes):
+			for old, new in [ (old_rw, rw), (old_bw, bw) ]:
+				o = old[i:i+row_bytes]
+				n = new[i:i+row_bytes]
+				if (o != n):
+					rows.append(i // row_bytes)
+					d = [ b for b in range(0, row_bytes) if o[b] != n[b] ]
+					cols.append(d[0])
+					cols.append(d[-1])
+		if (len(rows) == 0):
+			return None
+		return (rows[0], rows[-1], min(cols), max(cols))
+	d = (numpy.frombuffer(old_rw, numpy.uint8) != numpy.frombuffer(rw, numpy.uint8))
+	d = d | (numpy.frombuffer(old_bw, numpy.uint8) != numpy.frombuffer(bw, numpy.uint8))
+	d = d.reshape(-1, row_bytes)
+	rows = numpy.flatnonzero(d.any(axis=1))
+	if (rows.size == 0):
+		return None
+	cols = numpy.flatnonzero(d.any(axis=0))
+	return (int(rows[0]), int(rows[-1]), int(cols[0]), int(cols[-1]))
+
+# Copy window (from dirty_window) out of plane, row by row.
+def window_data(plane, win, row_bytes=22):
+	r0, r1, b0, b1 = win
+	return b"".join([ plane[r*row_bytes+b0 : r*row_bytes+b1+1] for r in range(r0, r1+1) ])
+
+# image in RGB mode and size width x height: smaller image is placed at top left
+# corner on white, bigger is clipped
+def fit_image(img, width, height):
+	if (img.size != (width, height)):
+		from PIL import Image
+		im = Image.new("RGB", (width, height), (0xff,0xff,0xff))
+		im.paste(img.crop((0, 0, min(img.size[0], width), min(img.size[1], height))), (0,0))
+		return im
+	if (img.mode != "RGB"):
+		return img.convert("RGB")
+	return img
+
+# PIL Image.transpose method of (rotate, mirror): image to native orientation
+ORIENT_TRANSPOSE = { (0, 1): "FLIP_LEFT_RIGHT", (90, 0): "ROTATE_270", (90, 1): "TRANSVERSE",
+	(180, 0): "ROTATE_180", (180, 1): "FLIP_TOP_BOTTOM", (270, 0): "ROTATE_90", (270, 1): "TRANSPOSE" }
+
+# Orientation of image on the panel: image is flipped left-right when mirror=1,
+# then rotated by rotate degrees clockwise (0, 90, 180, 270). width x height is
+# native (portrait) size, image size is self.width x self.height (swapped for
+# 90/270). perm is precomputed permutation: for each plane bit (native rows
+# bottom-up) index of image pixel (y * self.width + x), so rotation is folded
+# into packing loop. transpose is name of PIL transpose method doing the same
+# (used with NumPy). perm is None for native orientation (plain packing is used).
+class GDEWOrientation:
+	def __init__(self, rotate=0, mirror=0, width=176, height=264):
+		if (rotate not in (0, 90, 180, 270)):
+			raise ValueError("rotate must be 0, 90, 180 or 270 (not {})".format(rotate))
+		self.rotate = rotate
+		self.mirror = 1 if mirror else 0
+		self.native_width = width
+		self.native_height = height
+		self.width = width
+		self.height = height
+		if (rotate == 90 or rotate == 270):
+			self.width = height
+			self.height = width
+		self.perm = None
+		self.transpose = None
+		if (rotate != 0 or self.mirror):
+			self.perm = self.permutation()
+			self.transpose = ORIENT_TRANSPOSE[(rotate, self.mirror)]
+
+	# native (framebuffer) coordinates of image pixel x, y (numbers or NumPy arrays)
+	def to_native(self, x, y):
+		if (self.mirror):
+			x = self.width - 1 - x
+		if (self.rotate == 90):
+			return (self.native_width - 1 - y, x)
+		if (self.rotate == 180):
+			return (self.native_width - 1 - x, self.native_height - 1 - y)
+		if (self.rotate == 270):
+			return (y, self.native_height - 1 - x)
+		return (x, y)
+
+	def permutation(self):
+		n = self.width * self.height
+		if (use_numpy() is not None):
+			i = numpy.arange(n)
+			nx, ny = self.to_native(i % self.width, i // self.width)
+			perm = numpy.empty(n, numpy.intp)
+			perm[(self.native_height - 1 - ny) * self.native_width + nx] = i
+			return perm
+		perm = [0] * n
+		for i in range(0, n):
+			nx, ny = self.to_native(i % self.width, i // self.width)
+			perm[(self.native_height - 1 - ny) * self.native_width + nx] = i
+		return perm
+
+	# settings text (part of frame cache key), "" for native orientation
+	def settings(self):
+		if (self.perm is None):
+			return ""
+		return ";rotate={};mirror={}".format(self.rotate, self.mirror)
+
+# Framebuffer stored as two bitplanes in controller layout (ready for DTM2/DTM1).
+# Coordinates as in image: x 0..175 (left to right), y 0..263 (top to bottom).
+# Colors same as GDEWColor: white=0, black=1, red=2 (anything else = white).
+# Pixel is red when its rw bit is set, black when bw bit is set; drawing keeps
+# only one of them set. Pixels out of the buffer are ignored.
+class GDEWFrameBuffer:
+	def __init__(self, width=176, height=264):
+		self.width = width
+		self.height = height
+		self.row_bytes = width // 8
+		self.rw = bytearray(self.row_bytes * height)
+		self.bw = bytearray(self.row_bytes * height)
+
+	# byte index in plane of the first byte of image line y (rows are bottom-up)
+	def row_index(self, y):
+		return (self.height - 1 - y) * self.row_bytes
+
+	# set bits from mask in byte i of planes to color
+	def put(self, i, mask, color):
+		if (color == 2):
+			self.rw[i] |= mask
+			self.bw[i] &= ~mask & 0xff
+		elif (color == 1):
+			self.bw[i] |= mask
+			self.rw[i] &= ~mask & 0xff
+		else:
+			self.rw[i] &= ~mask & 0xff
+			self.bw[i] &= ~mask & 0xff
+
+	def fill(self, color=0):
+		n = len(self.rw)
+		self.rw[:] = (b"\xff" if color == 2 else b"\x00") * n
+		self.bw[:] = (b"\xff" if color == 1 else b"\x00") * n
+
+	def set_pix(self, x, y, color):
+		if (x < 0 or y < 0 or x >= self.width or y >= self.height):
+			return
+		self.put(self.row_index(y) + (x >> 3), 0x80 >> (x & 7), color)
+
+	# pixel color, pixels out of the buffer are white (0)
+	def get_pix(self, x, y):
+		if (x < 0 or y < 0 or x >= self.width or y >= self.height):
+			return 0
+		i = self.row_index(y) + (x >> 3)
+		m = 0x80 >> (x & 7)
+		if (self.rw[i] & m):
+			return 2
+		if (self.bw[i] & m):
+			return 1
+		return 0
+
+	# horizontal line from x0 to x1 (both included) in line y
+	def hline(self, x0, x1, y, color):
+		if (x0 > x1):
+			x0, x1 = x1, x0
+		x0 = max(x0, 0)
+		x1 = min(x1, self.width - 1)
+		if (y < 0 or y >= self.height or x0 > x1):
+			return
+		base = self.row_index(y)
+		b0 = x0 >> 3
+		b1 = x1 >> 3
+		m0 = 0xff >> (x0 & 7)
+		m1 = (0xff << (7 - (x1 & 7))) & 0xff
+		if (b0 == b1):
+			self.put(base + b0, m0 & m1, color)
+			return
+		self.put(base + b0, m0, color)
+		self.put(base + b1, m1, color)
+		# whole bytes between
+		n = b1 - b0 - 1
+		if (n > 0):
+			self.rw[base+b0+1 : base+b1] = (b"\xff" if color == 2 else b"\x00") * n
+			self.bw[base+b0+1 : base+b1] = (b"\xff" if color == 1 else b"\x00") * n
+
+	def vline(self, x, y0, y1, color):
+		if (y0 > y1):
+			y0, y1 = y1, y0
+		for y in range(max(y0, 0), min(y1, self.height - 1) + 1):
+			self.set_pix(x, y, color)
+
+	def fill_rect(self, x0, y0, x1, y1, color):
+		if (y0 > y1):
+			y0, y1 = y1, y0
+		for y in range(max(y0, 0), min(y1, self.height - 1) + 1):
+			self.hline(x0, x1, y, color)
+
+	def rect(self, x0, y0, x1, y1, color):
+		self.hline(x0, x1, y0, color)
+		self.hline(x0, x1, y1, color)
+		self.vline(x0, y0, y1, color)
+		self.vline(x1, y0, y1, color)
+
+	# line y as tuple (rw, bw) of row_bytes bytes each
+	def row(self, y):
+		i = self.row_index(y)
+		return (bytes(self.rw[i:i+self.row_bytes]), bytes(self.bw[i:i+self.row_bytes]))
+
+	def set_row(self, y, rw, bw):
+		i = self.row_index(y)
+		self.rw[i:i+self.row_bytes] = rw
+		self.bw[i:i+self.row_bytes] = bw
+
+	# planes as tuple (rw, bw) of bytes, as write_rw/write_bw take them
+	def planes(self):
+		return (bytes(self.rw), bytes(self.bw))
+
+	def set_planes(self, rw, bw):
+		self.rw[:] = rw
+		self.bw[:] = bw
+
+	# load PIL image (same thresholds as pack_planes), smaller image is placed
+	# at top left corner on white, bigger is clipped.
+	# orient: GDEWOrientation of image (None = native)
+	def from_pil(self, img, orient=None):
+		if (orient is not None and orient.perm is not None):
+			self.set_planes(*pack_planes_orient(img, orient))
+			return
+		img = fit_image(img, self.width, self.height)
+		rw, bw = pack_planes(img, self.width, self.height)
+		self.set_planes(rw, bw)
+
+	# framebuffer as new RGB PIL image (in orientation orient)
+	def to_pil(self, orient=None):
+		from PIL import Image
+		if (orient is not None and orient.perm is not None):
+			return self.to_pil_orient(orient)
+		if (use_numpy() is None):
+			im = Image.new("RGB", (self.width, self.height), (0xff,0xff,0xff))
+			for y in range(0, self.height):
+				for x in range(0, self.width):
+					c = self.get_pix(x, y)
+					if (c == 2):
+						im.putpixel((x,y), (0xff,0x00,0x00))
+					elif (c == 1):
+						im.putpixel((x,y), (0x00,0x00,0x00))
+			return im
+		shape = (self.height, self.width)
+		red = numpy.unpackbits(numpy.frombuffer(bytes(self.rw), numpy.uint8)).reshape(shape)[::-1]
+		black = numpy.unpackbits(numpy.frombuffer(bytes(self.bw), numpy.uint8)).reshape(shape)[::-1]
+		out = numpy.full(shape + (3,), 0xff, numpy.uint8)
+		out[black == 1] = 0x00
+		# red have priority over black
+		out[red == 1] = (0xff, 0x00, 0x00)
+		return Image.fromarray(out, "RGB")
+
+	def to_pil_orient(self, orient):
+		from PIL import Image
+		if (use_numpy() is None):
+			im = Image.new("RGB", (orient.width, orient.height), (0xff,0xff,0xff))
+			for y in range(0, orient.height):
+				for x in range(0, orient.width):
+					c = self.get_pix(*orient.to_native(x, y))
+					if (c == 2):
+						im.putpixel((x,y), (0xff,0x00,0x00))
+					elif (c == 1):
+						im.putpixel((x,y), (0x00,0x00,0x00))
+			return im
+		# plane bits are in perm order
+		red = numpy.empty(orient.perm.size, numpy.uint8)
+		black = numpy.empty(orient.perm.size, numpy.uint8)
+		red[orient.perm] = numpy.unpackbits(numpy.frombuffer(bytes(self.rw), numpy.uint8))
+		black[orient.perm] = numpy.unpackbits(numpy.frombuffer(bytes(self.bw), numpy.uint8))
+		shape = (orient.height, orient.width)
+		out = numpy.full(shape + (3,), 0xff, numpy.uint8)
+		out[black.reshape(shape) == 1] = 0x00
+		out[red.reshape(shape) == 1] = (0xff, 0x00, 0x00)
+		return Image.fromarray(out, "RGB")
@@ -0,0 +1,146 @@
+#!/usr/bin/python3
+
+#******************************************************************************
+# Name        : Panel group for E-INK GDEW027Z22 2,7" R/B/W
+#
+# Description : Drive several displays (GDEW027Z22 objects) from one Pi at
+#               the same time. Each panel is run in own thread: transfers to
+#               panels on the same SPI bus are serialized (one lock per bus),
+#               refresh (BUSY wait) of all panels is done in parallel, so
+#               refreshing N panels take about one refresh time (+ transfers).
+#               Each panel get own /RST, D/C and BUSY pins, panels on one bus
+#               use different CS.
+#
+# Date        : 2026-10-18
+# License     : Beerware (rv.42) - Google for it.
+#
+# Changelog   :
+#               - 0.1 - Initial version
+#               - 0.2 - software SPI panels sharing DATA/CLK (or gpiomem) are
+#                       serialized
+#******************************************************************************
+
+import time
+import threading
+
+# Group of panels.
+#   add(name, eink, bus=None) - add panel, bus is key of shared SPI bus (None =
+#                               see bus_key)
+#   fb_update(force)          - send framebuffers + refresh all panels
+#   update()                  - refresh all panels (RAM already loaded)
+#   run(fn)                   - call fn(name, eink, lock) for each panel in parallel
+# Results are dicts: name => { "result", "error", "transfer", "refresh", "total" }
+# (times in seconds, error is exception raised for this panel or None).
+class GDEWPanelGroup:
+	def __init__(self, panels=None):
+		self.panels = {}
+		self.buses = {}
+		self.bus_locks = {}
+		self.last_time = 0.0
+		if (panels is not None):
+			for name, eink in panels.items():
+				self.add(name, eink)
+
+	# bus of panel transport: spidev bus number, gpiomem register file (set_dir
+	# of any pin is read-modify-write of shared FSEL registers), DATA + CLK pins
+	# of software SPI (panels differ only in CS), else transport is not shared
+	def bus_key(self, eink):
+		io = eink.io
+		if (getattr(io, "spi_bus", None) is not None):
+			return io.spi_bus
+		if (getattr(io, "reg_file", None) is not None):
+			return ("gpiomem", io.reg_file)
+		if (getattr(io, "pin_clk", None) is not None):
+			return ("gpio", io.pin_clk, io.pin_dta)
+		return id(io)
+
+	def add(self, name, eink, bus=None):
+		if (bus is None):
+			bus = self.bus_key(eink)
+		self.panels[name] = eink
+		self.buses[name] = bus
+		if (bus not in self.bus_locks):
+			self.bus_locks[bus] = threading.Lock()
+
+	def remove(self, name):
+		del self.panels[name]
+		del self.buses[name]
+
+	# lock of bus used by panel
+	def lock(self, name):
+		return self.bus_locks[self.buses[name]]
+
+	# call fn(name, eink, lock) for every panel (or panels in names) in own thread,
+	# fn return dict merged to panel result. Return results when all are done.
+	def run(self, fn, names=None):
+		if (names is None):
+			names = list(self.panels.keys())
+		# keep panel order in results
+		results = dict.fromkeys(names)
+		def worker(name):
+			r = { "result": None, "error": None }
+			t0 = time.monotonic()
+			try:
+				r.update(fn(name, self.panels[name], self.lock(name)))
+			except Exception as ex:
+				r["error"] = ex
+			r["total"] = time.monotonic() - t0
+			results[name] = r
+		t0 = time.monotonic()
+		threads = [ threading.Thread(target=worker, args=(name,), daemon=True) for name in names ]
+		for th in threads:
+			th.start()
+		for th in threads:
+			th.join()
+		self.last_time = time.monotonic() - t0
+		return results
+
+	# wait for panel BUSY (without bus lock), return wait time
+	def refresh_wait(self, eink):
+		t = eink.phase_start()
+		w = eink.busy_wait()
+		eink.phase_end("refresh_wait", t)
+		return w
+
+	# send framebuffer of each panel and refresh them, see GDEW027Z22.fb_update
+	def fb_update(self, force=0, names=None):
+		def job(name, eink, lock):
+			t0 = time.monotonic()
+			with lock:
+				ret = eink.fb_update(force, 1)
+			t1 = time.monotonic()
+			w = 0.0
+			if (ret == 0):
+				w = self.refresh_wait(eink)
+			return { "result": ret, "transfer": t1 - t0, "refresh": w }
+		return self.run(job, names)
+
+	# refresh each panel, see GDEW027Z22.update
+	def update(self, names=None):
+		def job(name, eink, lock):
+			t0 = time.monotonic()
+			with lock:
+				ret = eink.update(1)
+			t1 = time.monotonic()
+			return { "result": ret, "transfer": t1 - t0, "refresh": self.refresh_wait(eink) }
+		return self.run(job, names)
+
+	# call method of each panel (e.g. "clear_bw", "shutdown") with bus locked
+	def call(self, method, *args, names=None):
+		def job(name, eink, lock):
+			t0 = time.monotonic()
+			with lock:
+				ret = getattr(eink, method)(*args)
+			return { "result": ret, "transfer": time.monotonic() - t0 }
+		return self.run(job, names)
+
+	# text report of results
+	def report(self, results):
+		r = []
+		for name, p in results.items():
+			if (p["error"] is not None):
+				r.append("{}: \033[31merror: {}\033[0m".format(name, p["error"]))
+				continue
+			r.append("{}: result={} transfer={:.3f}s refresh={:.3f}s total={:.3f}s".format(name, p["result"], p.get("transfer", 0.0), p.get("refresh", 0.0), p["total"]))
+		r.append("group: {:.3f}s".format(self.last_time))
+		return "\n".join(r)
@@ -0,0 +1,538 @@
+#!/usr/bin/python3
+
+#******************************************************************************
+# Name        : Transports for E-INK GDEW027Z22 2,7" R/B/W driver
+#
+# Description : Low level I/O used by GDEW027Z22 driver: /RST, D/C, BUSY pins
+#               and byte transfer (CS toggled after each byte).
+#               GDEWSpidevTransport - hardware SPI (spidev) + RPi.GPIO
+#               GDEWBitbangTransport - software SPI on RPi.GPIO pins
+#                                      (from GDEW027Z22_SOFT.py)
+#               GDEWGpiomemTransport - software SPI writing GPIO registers
+#                                      directly (mmap of /dev/gpiomem)
+#               Simulated controller is in GDEW027Z22_SIM.py.
+#               spidev and RPi.GPIO are imported only when transport is
+#               created without spi/gpio objects given.
+#
+# Date        : 2026-10-18
+# License     : Beerware (rv.42) - Google for it.
+#
+# Changelog   :
+#               - 0.1 - Initial version
+#               - 0.2 - GDEWGpiomemTransport
+#               - 0.3 - close(keepRst): /RST stays driven for warm attach
+#******************************************************************************
+
+import os
+import time
+import mmap
+import stat
+import ctypes
+import fcntl
+import itertools
+import threading
+
+# how data bytes are sent over spidev (CS is toggled after each byte in both modes)
+#   byte  - one spidev.xfer() call (ioctl) + sleep per byte
+#   batch - one SPI_IOC_MESSAGE ioctl with many 1 byte segments with cs_change set,
+#           up to SPI_IOC_MAX_SEGMENTS (or spidev bufsiz) bytes per ioctl
+class GDEWXferMode:
+	byte=0
+	batch=1
+
+# struct spi_ioc_transfer from linux/spi/spidev.h (32 bytes)
+class spi_ioc_transfer(ctypes.Structure):
+	_fields_ = [
+		("tx_buf", ctypes.c_uint64),
+		("rx_buf", ctypes.c_uint64),
+		("len", ctypes.c_uint32),
+		("speed_hz", ctypes.c_uint32),
+		("delay_usecs", ctypes.c_uint16),
+		("bits_per_word", ctypes.c_uint8),
+		("cs_change", ctypes.c_uint8),
+		("tx_nbits", ctypes.c_uint8),
+		("rx_nbits", ctypes.c_uint8),
+		("word_delay_usecs", ctypes.c_uint8),
+		("pad", ctypes.c_uint8)
+	]
+
+# ioctl size field have 14 bits => max 511 transfers of 32 bytes in one message
+SPI_IOC_MAX_SEGMENTS=511
+
+# _IOW(SPI_IOC_MAGIC['k'], 0, char[SPI_MSGSIZE(n)])
+def SPI_IOC_MESSAGE(n):
+	return (1 << 30) | ((n * ctypes.sizeof(spi_ioc_transfer)) << 16) | (ord('k') << 8)
+
+# spidev max bytes per message (module parameter), 4096 by default
+def spidev_bufsiz():
+	try:
+		with open("/sys/module/spidev/parameters/bufsiz") as f:
+			return int(f.read())
+	except:
+		return 4096
+
+# Transport interface used by the driver.
+#   set_rst(v), set_dc(v)   - set /RST, D/C pin level
+#   get_bsy()               - BUSY pin level (0 = controller busy)
+#   write(data)             - send bytes (CS toggled after each byte)
+#   read_byte()             - read one byte
+#   wait_bsy(timeout)       - sleep until BUSY rising edge (max timeout seconds)
+#   bsy_event_on(callback)  - call callback(pin) (from other thread) on BUSY rising edge
+#   bsy_event_off()         - disable callback
+#   close(keepRst)          - release hardware (only own pins, see pins()),
+#                             keepRst=1: /RST stays driven high (warm attach)
+# stats is GDEWStats object set by driver (counters: bytes, ioctls, gpio) or None.
+class GDEWTransport:
+	stats = None
+
+	def set_rst(self, v):
+		raise NotImplementedError
+
+	def set_dc(self, v):
+		raise NotImplementedError
+
+	def get_bsy(self):
+		raise NotImplementedError
+
+	def write(self, data):
+		raise NotImplementedError
+
+	def read_byte(self):
+		raise NotImplementedError
+
+	def wait_bsy(self, timeout):
+		self.gpio.wait_for_edge(self.pin_bsy, self.gpio.RISING, timeout=int(timeout*1000)+1)
+
+	def bsy_event_on(self, callback):
+		self.gpio.add_event_detect(self.pin_bsy, self.gpio.RISING, callback=callback)
+
+	def bsy_event_off(self):
+		self.gpio.remove_event_detect(self.pin_bsy)
+
+	# GPIO pins of this transport
+	def pins(self):
+		return [ self.pin_dc, self.pin_rst, self.pin_bsy ]
+
+	# pins released by close(): /RST released as input would float and could
+	# reset controller which warm attach of next run take as initialized
+	def release_pins(self, keepRst=0):
+		pins = self.pins()
+		if (keepRst):
+			pins.remove(self.pin_rst)
+		return pins
+
+	# release only own pins (other panels in this process keep theirs)
+	def close(self, keepRst=0):
+		self.gpio.cleanup(self.release_pins(keepRst))
+
+# Hardware SPI (spidev) + RPi.GPIO for D/C, /RST and BUSY
+class GDEWSpidevTransport(GDEWTransport):
+	def __init__(self, spiBus=0, spiCs=0, spiClockHz=5000, dcPin=25, rstPin=24, bsyPin=23, halfBitDelay=0.000001, xferMode=GDEWXferMode.byte, spi=None, gpio=None):
+		self.spi_bus = spiBus
+		self.spi_cs = spiCs
+		self.pin_dc = dcPin
+		self.pin_rst = rstPin
+		self.pin_bsy = bsyPin
+		self.hdelay = halfBitDelay
+		self.xfer_mode = xferMode
+		if (gpio is None):
+			import RPi.GPIO as gpio
+		self.gpio = gpio
+		if (spi is None):
+			import spidev
+			spi = spidev.SpiDev()
+		self.spi = spi
+		self.ioctl = fcntl.ioctl
+		# setup I/O
+		self.gpio.setmode(self.gpio.BCM)
+		# setup SPI
+		self.spi.open(self.spi_bus,self.spi_cs)
+		self.spi.mode = 0b00 # mode 0 (data latched on rising edge, on falling update, idle clk: low)
+		self.spi.max_speed_hz = spiClockHz
+		if (self.xfer_mode == GDEWXferMode.batch):
+			self.batch_setup()
+		# D/C
+		self.gpio.setup(self.pin_dc, self.gpio.OUT, initial=1)
+		# /RST
+		self.gpio.setup(self.pin_rst, self.gpio.OUT, initial=1)
+		# /BSY
+		self.gpio.setup(self.pin_bsy, self.gpio.IN, pull_up_down=self.gpio.PUD_UP)
+
+	def close(self, keepRst=0):
+		self.spi.close()
+		self.gpio.cleanup(self.release_pins(keepRst))
+
+	def set_rst(self, v):
+		if (self.stats is not None):
+			self.stats.count("gpio")
+		self.gpio.output(self.pin_rst, v)
+
+	def set_dc(self, v):
+		if (self.stats is not None):
+			self.stats.count("gpio")
+		self.gpio.output(self.pin_dc, v)
+
+	def get_bsy(self):
+		if self.gpio.input(self.pin_bsy):
+			return 1
+		else:
+			return 0
+
+	# prepare SPI_IOC_MESSAGE segments for batch mode. Segment i send byte
+	# batch_buf[i] and release CS after it. Segments are build once and only
+	# data in batch_buf is replaced for each ioctl.
+	def batch_setup(self):
+		self.batch_max = min(SPI_IOC_MAX_SEGMENTS, spidev_bufsiz())
+		self.batch_buf = (ctypes.c_ubyte * self.batch_max)()
+		self.batch_seg = (spi_ioc_transfer * self.batch_max)()
+		base = ctypes.addressof(self.batch_buf)
+		# same inter-byte pause as byte mode (xfer delay + hdelay)
+		delay = max(1, int(round(self.hdelay * 1000000)))
+		for i in range(0, self.batch_max):
+			seg = self.batch_seg[i]
+			seg.tx_buf = base + i
+			seg.len = 1
+			seg.speed_hz = self.spi.max_speed_hz
+			seg.delay_usecs = delay
+			seg.bits_per_word = 8
+			seg.cs_change = 1
+
+	# send bytes with CS toggle after each byte, batch_max bytes per ioctl
+	def send_batch(self, data):
+		data = bytes(data)
+		n = len(data)
+		pos = 0
+		while (pos < n):
+			cnt = min(n - pos, self.batch_max)
+			ctypes.memmove(self.batch_buf, data[pos:pos+cnt], cnt)
+			# cs_change on last segment means "keep CS active after message", so clear it
+			self.batch_seg[cnt-1].cs_change = 0
+			try:
+				self.ioctl(self.spi.fileno(), SPI_IOC_MESSAGE(cnt), self.batch_seg)
+			finally:
+				self.batch_seg[cnt-1].cs_change = 1
+			pos = pos + cnt
+
+	# each byte must end with CS toggle, so in byte mode we have to send by one byte eveything
+	def write(self, data):
+		if (self.stats is not None):
+			self.stats.count("bytes", len(data))
+			if (self.xfer_mode == GDEWXferMode.batch):
+				self.stats.count("ioctls", (len(data) + self.batch_max - 1) // self.batch_max)
+			else:
+				self.stats.count("ioctls", len(data))
+		if (self.xfer_mode == GDEWXferMode.batch):
+			self.send_batch(data)
+			return
+		for b in data:
+			self.spi.xfer( [ b & 0x00ff ] , self.spi.max_speed_hz, 1)
+			time.sleep(self.hdelay)
+
+	def read_byte(self):
+		if (self.stats is not None):
+			self.stats.count("ioctls")
+		r = self.spi.xfer([0xff])
+		try:
+			if (len(r) < 1):
+				print("Get byte 0 length!")
+				return 0
+		except:
+			return 0
+		time.sleep(self.hdelay)
+		return r[0]
+
+# Software SPI (bitbang) on RPi.GPIO, DATA pin is bi-directional (MOSI & MISO
+# connected with 1k resistor). With halfBitDelay=0 there are no sleeps at all.
+class GDEWBitbangTransport(GDEWTransport):
+	def __init__(self, dtaPin=9, clkPin=11, csPin=8, dcPin=25, rstPin=24, bsyPin=23, halfBitDelay=0.000001, gpio=None):
+		self.pin_dta = dtaPin
+		self.pin_clk = clkPin
+		self.pin_dc = dcPin
+		self.pin_cs = csPin
+		self.pin_rst = rstPin
+		self.pin_bsy = bsyPin
+		self.hdelay = halfBitDelay
+		if (gpio is None):
+			import RPi.GPIO as gpio
+		self.gpio = gpio
+		# setup I/O
+		self.gpio.setmode(self.gpio.BCM)
+		# data pin
+		self.gpio.setup(self.pin_dta, self.gpio.IN, pull_up_down=self.gpio.PUD_UP)
+		# clock
+		self.gpio.setup(self.pin_clk, self.gpio.OUT, initial=0)
+		# D/C
+		self.gpio.setup(self.pin_dc, self.gpio.OUT, initial=1)
+		# CS
+		self.gpio.setup(self.pin_cs, self.gpio.OUT, initial=1)
+		# /RST
+		self.gpio.setup(self.pin_rst, self.gpio.OUT, initial=1)
+		# /BSY
+		self.gpio.setup(self.pin_bsy, self.gpio.IN, pull_up_down=self.gpio.PUD_UP)
+
+	def pins(self):
+		return [ self.pin_dta, self.pin_clk, self.pin_dc, self.pin_cs, self.pin_rst, self.pin_bsy ]
+
+	def set_rst(self, v):
+		if (self.stats is not None):
+			self.stats.count("gpio")
+		self.gpio.output(self.pin_rst, v)
+
+	def set_dc(self, v):
+		if (self.stats is not None):
+			self.stats.count("gpio")
+		self.gpio.output(self.pin_dc, v)
+
+	def get_bsy(self):
+		if self.gpio.input(self.pin_bsy):
+			return 1
+		else:
+			return 0
+
+	def delay(self):
+		if (self.hdelay):
+			time.sleep(self.hdelay)
+
+	def send_byte(self, b):
+		g = self.gpio
+		g.output(self.pin_cs, 0)
+		self.delay()
+		g.setup(self.pin_dta, g.OUT)
+		for i in range(0,8):
+			if (b & 0x80):
+				g.output(self.pin_dta, 1)
+			else:
+				g.output(self.pin_dta, 0)
+			self.delay()
+			g.output(self.pin_clk, 1)
+			self.delay()
+			g.output(self.pin_clk, 0)
+			b = b << 1
+		self.delay()
+		g.setup(self.pin_dta, g.IN, pull_up_down=g.PUD_UP)
+		g.output(self.pin_cs, 1)
+
+	def write(self, data):
+		if (self.stats is not None):
+			# CS x2, DATA x8, CLK x16
+			self.stats.count("bytes", len(data))
+			self.stats.count("gpio", 26 * len(data))
+		for i in range(0, len(data)):
+			self.send_byte(data[i])
+			# every 100 writed do a longer pause for OS to do things
+			if (self.hdelay and (i%100)==99):
+				time.sleep(0.001)
+
+	def read_byte(self):
+		if (self.stats is not None):
+			self.stats.count("gpio", 19)
+		g = self.gpio
+		r = 0
+		g.output(self.pin_cs, 0)
+		self.delay()
+		g.setup(self.pin_dta, g.IN, pull_up_down=g.PUD_UP)
+		for i in range(0,8):
+			self.delay()
+			g.output(self.pin_clk, 0)
+			self.delay()
+			r = r << 1
+			if (g.input(self.pin_dta)):
+				r = r | 0x01
+			g.output(self.pin_clk, 1)
+		self.delay()
+		g.output(self.pin_cs, 1)
+		g.output(self.pin_clk, 0)
+		return r
+
+# GPIO registers of BCM2835..BCM2711 (32-bit words index in /dev/gpiomem map)
+GPIO_FSEL0=0
+GPIO_SET0=7
+GPIO_CLR0=10
+GPIO_LEV0=13
+GPIO_FSEL_IN=0
+GPIO_FSEL_OUT=1
+GPIOMEM_SIZE=4096
+
+# Software SPI writing GPIO set/clear registers directly through mmap of
+# /dev/gpiomem (no RPi.GPIO, no root). Waveform of each byte is one table of
+# (register, mask) writes made at start: CS low, DATA set only when bit changes
+# (going low together with CLK falling edge), CLK high, CLK low, ..., CS high.
+# DATA pin is switched to output once for whole write() burst.
+# There are no sleeps between edges: one register write from python take longer
+# than controller's half bit time, halfBitDelay (if not 0) is pause after each byte.
+# regFile can be a regular file out of /dev (created with GPIOMEM_SIZE bytes) used
+# as stand-in for the registers: levels (BUSY, DATA) are read from GPLEV0 word in it.
+# trace: list to which all register writes are appended as (register, value)
+# (see GDEW027Z22_SIM.decode_gpiomem), None = no tracing.
+# Pins must be GPIO 0..31, pull-ups are not set (BUSY is driven by the panel).
+class GDEWGpiomemTransport(GDEWTransport):
+	def __init__(self, dtaPin=9, clkPin=11, csPin=8, dcPin=25, rstPin=24, bsyPin=23, halfBitDelay=0, regFile="/dev/gpiomem", trace=None):
+		self.pin_dta = dtaPin
+		self.pin_clk = clkPin
+		self.pin_dc = dcPin
+		self.pin_cs = csPin
+		self.pin_rst = rstPin
+		self.pin_bsy = bsyPin
+		self.hdelay = halfBitDelay
+		self.trace = trace
+		for pin in (dtaPin, clkPin, dcPin, csPin, rstPin, bsyPin):
+			if (pin < 0 or pin > 31):
+				raise ValueError("GPIO{}: only GPIO 0..31 are supported".format(pin))
+		# all transports on one register file share the mapping (see GDEWPanelGroup)
+		self.reg_file = os.path.realpath(regFile)
+		# device (/dev/...) must exist and be character device, only stand-in file is created
+		device = regFile.startswith("/dev/")
+		flags = os.O_RDWR | os.O_SYNC
+		if (device == False):
+			flags = flags | os.O_CREAT
+		try:
+			fd = os.open(regFile, flags, 0o644)
+		except FileNotFoundError:
+			raise FileNotFoundError("{} not found (gpiomem driver not loaded or not a Raspberry Pi?)".format(regFile)) from None
+		try:
+			st = os.fstat(fd)
+			if (device and stat.S_ISCHR(st.st_mode) == False):
+				raise OSError("{} is not a character device (stray file? remove it)".format(regFile))
+			if (device == False and st.st_size < GPIOMEM_SIZE and stat.S_ISREG(st.st_mode)):
+				os.ftruncate(fd, GPIOMEM_SIZE)
+			self.mm = mmap.mmap(fd, GPIOMEM_SIZE)
+		finally:
+			os.close(fd)
+		self.regs = memoryview(self.mm).cast("I")
+		self.byte_writes = [ self.byte_seq(b) for b in range(0, 256) ]
+		self.byte_len = [ len(w) for w in self.byte_writes ]
+		# setup I/O (level first, then direction, so there is no glitch)
+		self.set_pin(self.pin_clk, 0)
+		self.set_pin(self.pin_dc, 1)
+		self.set_pin(self.pin_cs, 1)
+		self.set_pin(self.pin_rst, 1)
+		self.set_dir(self.pin_clk, GPIO_FSEL_OUT)
+		self.set_dir(self.pin_dc, GPIO_FSEL_OUT)
+		self.set_dir(self.pin_cs, GPIO_FSEL_OUT)
+		self.set_dir(self.pin_rst, GPIO_FSEL_OUT)
+		self.set_dir(self.pin_dta, GPIO_FSEL_IN)
+		self.set_dir(self.pin_bsy, GPIO_FSEL_IN)
+
+	# output pins (/RST too) keep their level and direction
+	def close(self, keepRst=0):
+		if (self.mm is not None):
+			self.set_dir(self.pin_dta, GPIO_FSEL_IN)
+			self.regs.release()
+			self.mm.close()
+			self.mm = None
+
+	def reg_write(self, reg, v):
+		self.regs[reg] = v
+		if (self.trace is not None):
+			self.trace.append((reg, v))
+
+	def set_pin(self, pin, v):
+		self.reg_write(GPIO_SET0 if v else GPIO_CLR0, 1 << pin)
+
+	def get_pin(self, pin):
+		return (self.regs[GPIO_LEV0] >> pin) & 0x01
+
+	def set_dir(self, pin, mode):
+		reg = GPIO_FSEL0 + pin // 10
+		shift = (pin % 10) * 3
+		self.reg_write(reg, (self.regs[reg] & ~(7 << shift)) | (mode << shift))
+
+	# register writes sending byte b, DATA is low before and after
+	def byte_seq(self, b):
+		cs = 1 << self.pin_cs
+		clk = 1 << self.pin_clk
+		dta = 1 << self.pin_dta
+		seq = []
+		clr = cs
+		level = 0
+		for i in range(7, -1, -1):
+			bit = (b >> i) & 0x01
+			if (bit != level):
+				if (bit):
+					if (clr):
+						seq.append((GPIO_CLR0, clr))
+						clr = 0
+					seq.append((GPIO_SET0, dta))
+				else:
+					clr |= dta
+				level = bit
+			if (clr):
+				seq.append((GPIO_CLR0, clr))
+			seq.append((GPIO_SET0, clk))
+			clr = clk
+		if (level):
+			clr |= dta
+		seq.append((GPIO_CLR0, clr))
+		seq.append((GPIO_SET0, cs))
+		return tuple(seq)
+
+	def set_rst(self, v):
+		if (self.stats is not None):
+			self.stats.count("gpio")
+		self.set_pin(self.pin_rst, v)
+
+	def set_dc(self, v):
+		if (self.stats is not None):
+			self.stats.count("gpio")
+		self.set_pin(self.pin_dc, v)
+
+	def get_bsy(self):
+		return self.get_pin(self.pin_bsy)
+
+	# no edge detection without RPi.GPIO, BUSY is polled every 1ms
+	def wait_bsy(self, timeout):
+		t0 = time.monotonic()
+		while (self.get_bsy() == 0 and time.monotonic() - t0 < timeout):
+			time.sleep(0.001)
+
+	def bsy_event_on(self, callback):
+		self.bsy_stop = 0
+		def poll():
+			while (self.bsy_stop == 0):
+				if (self.get_bsy()):
+					callback(self.pin_bsy)
+					return
+				time.sleep(0.001)
+		self.bsy_thread = threading.Thread(target=poll, daemon=True)
+		self.bsy_thread.start()
+
+	def bsy_event_off(self):
+		self.bsy_stop = 1
+		self.bsy_thread.join()
+
+	def write(self, data):
+		if (self.stats is not None):
+			self.stats.count("bytes", len(data))
+			self.stats.count("gpio", sum(map(self.byte_len.__getitem__, data)))
+		regs = self.regs
+		tab = self.byte_writes
+		self.set_dir(self.pin_dta, GPIO_FSEL_OUT)
+		try:
+			if (self.trace is not None or self.hdelay):
+				for b in data:
+					for reg, v in tab[b]:
+						regs[reg] = v
+					if (self.trace is not None):
+						self.trace.extend(tab[b])
+					if (self.hdelay):
+						time.sleep(self.hdelay)
+				return
+			for reg, v in itertools.chain.from_iterable(map(tab.__getitem__, data)):
+				regs[reg] = v
+		finally:
+			self.set_dir(self.pin_dta, GPIO_FSEL_IN)
+
+	# DATA is input, controller change it after CLK rising edge, sample before next one
+	def read_byte(self):
+		if (self.stats is not None):
+			self.stats.count("gpio", 18)
+		cs = 1 << self.pin_cs
+		clk = 1 << self.pin_clk
+		r = 0
+		self.reg_write(GPIO_CLR0, cs)
+		for i in range(0, 8):
+			r = (r << 1) | self.get_pin(self.pin_dta)
+			self.reg_write(GPIO_SET0, clk)
+			self.reg_write(GPIO_CLR0, clk)
+		self.reg_write(GPIO_SET0, cs)
+		return r
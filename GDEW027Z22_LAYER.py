@@ -0,0 +1,232 @@
+#!/usr/bin/python3
+
+#******************************************************************************
+# Name        : Layer compositor for E-INK GDEW027Z22 2,7" R/B/W
+#
+# Description : Frame made of stack of layers (background logo, semi-static
+#               panels, changing values). Every layer keeps own packed R/W
+#               and B/W planes and clip mask (plane of bits owned by the
+#               layer), and is drawn again only when it was invalidated
+#               (or its value changed). Planes are composed bottom to top:
+#                 rw = (rw & ~mask) | (layer_rw & mask)   (same for bw)
+#               and at the end bw &= ~rw (red has priority over black, as on
+#               the panel). Composition of layers below the lowest changed
+#               one is kept, so a changed value costs its render and few
+#               bitwise operations over 5808 bytes (NumPy, or Python ints
+#               without it).
+#
+# Date        : 2026-10-18
+# License     : Beerware (rv.42) - Google for it.
+#
+# Changelog   :
+#               - 0.1 - Initial version
+#******************************************************************************
+
+from GDEW027Z22_FB import GDEWFrameBuffer, GDEWDither, PLANE_SIZE, use_numpy, convert_image, is_raw, load_raw
+
+# Compose layer planes (lrw, lbw) over planes (rw, bw) where mask bits are set
+# (mask None = non-white pixels of layer), red has priority over black.
+# Return tuple (rw, bw) of bytes.
+def compose_planes(rw, bw, lrw, lbw, mask=None):
+	numpy = use_numpy()
+	if (numpy is not None):
+		rw = numpy.frombuffer(rw, numpy.uint8)
+		bw = numpy.frombuffer(bw, numpy.uint8)
+		lrw = numpy.frombuffer(lrw, numpy.uint8)
+		lbw = numpy.frombuffer(lbw, numpy.uint8)
+		if (mask is None):
+			m = lrw | lbw
+		else:
+			m = numpy.frombuffer(mask, numpy.uint8)
+		r = (rw & ~m) | (lrw & m)
+		b = (bw & ~m) | (lbw & m)
+		b &= ~r
+		return (r.tobytes(), b.tobytes())
+	# whole plane as one Python int, bitwise operations are done in C too
+	n = len(rw)
+	rw = int.from_bytes(rw, "big")
+	bw = int.from_bytes(bw, "big")
+	lrw = int.from_bytes(lrw, "big")
+	lbw = int.from_bytes(lbw, "big")
+	if (mask is None):
+		m = lrw | lbw
+	else:
+		m = int.from_bytes(mask, "big")
+	r = (rw & ~m) | (lrw & m)
+	b = ((bw & ~m) | (lbw & m)) & ~r
+	return (r.to_bytes(n, "big"), b.to_bytes(n, "big"))
+
+# One layer: planes in GDEWFrameBuffer (self.fb) drawn in orientation orient.
+#   render - render(layer) draw the layer (on white), called by compositor when
+#            layer was invalidated (invalidate(), set() with other value)
+#   clip   - None: layer cover only its non-white pixels (white is transparent),
+#            (x0, y0, x1, y1): layer own this rectangle (white in it is white),
+#            bytes: mask plane (5808 bytes, set bit = pixel owned by layer)
+# Drawing methods (fill, rect, text, image, load, set_planes) mark layer changed.
+class GDEWLayer:
+	def __init__(self, name, render=None, clip=None, orient=None, glyphCache=None):
+		self.name = name
+		self.render = render
+		self.orient = orient
+		self.glyph_cache = glyphCache
+		self.fb = GDEWFrameBuffer()
+		self.value = None
+		self.renders = 0
+		self.dirty = 1 if render is not None else 0
+		self.changed = 1
+		self.mask = None
+		if (isinstance(clip, tuple)):
+			m = GDEWFrameBuffer()
+			m.fill_rect(*self.native(clip[0], clip[1]), *self.native(clip[2], clip[3]), 1)
+			self.mask = bytes(m.bw)
+		elif (clip is not None):
+			if (len(clip) != PLANE_SIZE):
+				raise ValueError("clip mask must have {} bytes".format(PLANE_SIZE))
+			self.mask = bytes(clip)
+
+	def native(self, x, y):
+		if (self.orient is None):
+			return (x, y)
+		return self.orient.to_native(x, y)
+
+	# draw layer again before next composition
+	def invalidate(self):
+		self.dirty = 1
+
+	# set value shown by layer (render use layer.value), invalidate when it changed
+	def set(self, value):
+		if (value != self.value):
+			self.value = value
+			self.dirty = 1
+
+	# call render when layer is invalidated, return 1 when it was drawn
+	def rasterise(self):
+		if (self.dirty == 0 or self.render is None):
+			return 0
+		self.dirty = 0
+		self.fb.fill(0)
+		self.render(self)
+		self.renders += 1
+		self.changed = 1
+		return 1
+
+	def fill(self, color=0):
+		self.fb.fill(color)
+		self.changed = 1
+
+	def rect(self, x0, y0, x1, y1, color=1, fill=0):
+		x0, y0 = self.native(x0, y0)
+		x1, y1 = self.native(x1, y1)
+		if (fill):
+			self.fb.fill_rect(x0, y0, x1, y1, color)
+		else:
+			self.fb.rect(x0, y0, x1, y1, color)
+		self.changed = 1
+
+	# text from glyph atlas (GDEW027Z22_TEXT.py), return x after the text
+	def text(self, x, y, text, color=1, font=None, size=16):
+		if (self.glyph_cache is None):
+			from GDEW027Z22_TEXT import glyph_cache
+			self.glyph_cache = glyph_cache
+		self.changed = 1
+		return self.glyph_cache.draw(self.fb, x, y, text, color, font, size, self.orient)
+
+	# PIL image (placed at top left, same thresholds as pack_planes)
+	def image(self, img):
+		self.fb.from_pil(img, self.orient)
+		self.changed = 1
+
+	# image file (as GDEW027Z22.fb_load, without frame cache) or raw planes file
+	def load(self, fname, dither=GDEWDither.none):
+		if (is_raw(fname)):
+			self.set_planes(*load_raw(fname))
+			return
+		if (self.orient is None):
+			self.image(convert_image(fname, dither))
+		else:
+			self.image(convert_image(fname, dither, self.orient.width, self.orient.height))
+
+	def set_planes(self, rw, bw):
+		self.fb.set_planes(rw, bw)
+		self.changed = 1
+
+# Stack of layers (bottom first) composed into planes.
+#   eink   - GDEW027Z22 driver: layers use its orientation, update() show result
+#   orient - orientation when there is no driver (None = native)
+# stats: renders (layers drawn), composes (layers composed), skips (compose()
+# calls with nothing changed)
+class GDEWCompositor:
+	def __init__(self, eink=None, orient=None, glyphCache=None):
+		self.eink = eink
+		if (eink is not None):
+			orient = eink.orient
+		self.orient = orient
+		self.glyph_cache = glyphCache
+		self.layers = []
+		# composed planes (rw, bw) after each layer
+		self.prefix = []
+		self.white = (bytes(PLANE_SIZE), bytes(PLANE_SIZE))
+		self.stats = { "renders": 0, "composes": 0, "skips": 0 }
+
+	# add layer on top (or at index), return GDEWLayer
+	def add(self, name, render=None, clip=None, index=None):
+		if (self.find(name) is not None):
+			raise ValueError("layer {} already exists".format(name))
+		layer = GDEWLayer(name, render, clip, self.orient, self.glyph_cache)
+		if (index is None):
+			index = len(self.layers)
+		self.layers.insert(index, layer)
+		del self.prefix[index:]
+		return layer
+
+	# index of layer name or None
+	def find(self, name):
+		for i in range(0, len(self.layers)):
+			if (self.layers[i].name == name):
+				return i
+		return None
+
+	def layer(self, name):
+		i = self.find(name)
+		if (i is None):
+			raise KeyError(name)
+		return self.layers[i]
+
+	def remove(self, name):
+		i = self.find(name)
+		if (i is None):
+			raise KeyError(name)
+		del self.layers[i]
+		del self.prefix[i:]
+
+	# draw invalidated layers and compose from the lowest changed one,
+	# return planes (rw, bw)
+	def compose(self):
+		start = len(self.prefix)
+		for i in range(0, len(self.layers)):
+			layer = self.layers[i]
+			self.stats["renders"] += layer.rasterise()
+			if (layer.changed and i < start):
+				start = i
+		if (start == len(self.layers)):
+			self.stats["skips"] += 1
+		del self.prefix[start:]
+		for i in range(start, len(self.layers)):
+			layer = self.layers[i]
+			rw, bw = self.white
+			if (i > 0):
+				rw, bw = self.prefix[i - 1]
+			self.prefix.append(compose_planes(rw, bw, layer.fb.rw, layer.fb.bw, layer.mask))
+			layer.changed = 0
+			self.stats["composes"] += 1
+		if (len(self.prefix) == 0):
+			return self.white
+		return self.prefix[-1]
+
+	# compose and show on eink (fb_update: unchanged planes are not sent,
+	# small change can be partial refresh), return fb_update result
+	def update(self, force=0, noWait=0):
+		rw, bw = self.compose()
+		self.eink.img = None
+		self.eink.fb.set_planes(rw, bw)
+		return self.eink.fb_update(force, noWait)
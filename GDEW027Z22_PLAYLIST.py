@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+
+#******************************************************************************
+# Name        : Playlist (slideshow) for E-INK GDEW027Z22 2,7" R/B/W
+#
+# Description : Show images from directories / list of files one after other,
+#               each for dwell seconds. Upcoming images are converted to
+#               planes (decode + thumbnail + quantize/dither + pack, or frame
+#               cache hit) in a process pool while current image is sent and
+#               refreshed. Up to "ahead" images are converted and waiting
+#               (bounded queue of ready planes), so next image is ready when
+#               its time come and conversion does not add to time between
+#               refreshes (as long as one conversion is shorter than dwell).
+#               Images are shown by show(rw, bw) function: show_eink (driver
+#               in this process) or show_daemon (GDEW027Z22_DAEMON.py).
+#
+# Date        : 2026-10-18
+# License     : Beerware (rv.42) - Google for it.
+#
+# Changelog   :
+#               - 0.1 - Initial version
+#               - 0.2 - orientation of images (orient, as driver's fb_load)
+#******************************************************************************
+
+import os
+import time
+import signal
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from GDEW027Z22_FB import GDEWDither, GDEWFrameBuffer, GDEWOrientation, is_raw, load_raw, convert_image, convert_settings
+
+# file extensions taken from directories
+PLAYLIST_EXT = (".png", ".bmp", ".gif", ".jpg", ".jpeg", ".tif", ".tiff", ".webp", ".ppm", ".raw")
+
+# files of playlist: entries are files or directories (files in them sorted by name)
+def playlist_files(entries):
+	files = []
+	for p in entries:
+		if (os.path.isdir(p)):
+			for f in sorted(os.listdir(p)):
+				f = os.path.join(p, f)
+				if (os.path.isfile(f) and f.lower().endswith(PLAYLIST_EXT)):
+					files.append(f)
+		else:
+			files.append(p)
+	return files
+
+# frame cache of pool worker (opened by worker_init)
+worker_cache = None
+# orientations of pool worker: (rotate, mirror) => GDEWOrientation (permutation is made once)
+worker_orient = {}
+
+def worker_init(cachePath, cacheEntries):
+	global worker_cache
+	# Ctrl+C is handled by main process, workers run with lower priority
+	# (main process only sleep or wait for BUSY, but it should not wait for CPU)
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	os.nice(5)
+	if (cachePath is not None):
+		from GDEW027Z22_CACHE import GDEWFrameCache
+		worker_cache = GDEWFrameCache(cachePath, cacheEntries)
+
+# convert image file to (rw, bw) planes, same result (and frame cache key) as
+# GDEW027Z22.fb_load of driver with orientation rotate, mirror (run in pool worker)
+def convert_planes(fname, dither=GDEWDither.none, rotate=0, mirror=0):
+	if (is_raw(fname)):
+		return load_raw(fname)
+	o = worker_orient.get((rotate, mirror))
+	if (o is None):
+		o = GDEWOrientation(rotate, mirror)
+		worker_orient[(rotate, mirror)] = o
+	key = None
+	if (worker_cache is not None):
+		key = worker_cache.key(fname, convert_settings(dither, o.width, o.height) + o.settings())
+		planes = worker_cache.get(key)
+		if (planes is not None):
+			return planes
+	fb = GDEWFrameBuffer()
+	fb.from_pil(convert_image(fname, dither, o.width, o.height), o)
+	rw, bw = fb.planes()
+	if (key is not None):
+		worker_cache.put(key, rw, bw)
+	return (rw, bw)
+
+# show function: planes to driver (GDEW027Z22 object), return fb_update result
+def show_eink(eink, force=0):
+	def show(rw, bw):
+		eink.img = None
+		eink.fb.set_planes(rw, bw)
+		return eink.fb_update(force)
+	return show
+
+# show function: planes sent to daemon, return its result
+def show_daemon(path=None, force=0):
+	from GDEW027Z22_DAEMON import daemon_request
+	def show(rw, bw):
+		resp = daemon_request({ "cmd": "planes", "force": force }, bytes(rw) + bytes(bw), path)
+		if (resp["ok"] == False):
+			raise RuntimeError("daemon: {}".format(resp["error"]))
+		return resp["result"]
+	return show
+
+# Playlist of files shown by show(rw, bw).
+#   dwell      - seconds from start of one image to start of next one (when
+#                show, e.g. refresh, take longer next image start right after it)
+#   ahead      - max number of images converted ahead
+#   workers    - processes in pool (None = number of CPUs)
+#   frameCache - GDEWFrameCache, opened by path in each worker
+#   onStep     - called with each step dict after image is shown
+#   orient     - GDEWOrientation of images (e.g. eink.orient for show_eink(eink)),
+#                None = native
+# run() return steps (last 256): { "file", "result", "error", "wait", "late", "show" }
+#   wait - time spent waiting for conversion, late - time start of show was
+#   delayed by it (0.0 when planes were ready in time), show - show() time
+class GDEWPlaylist:
+	def __init__(self, show, files, dwell=60.0, ahead=2, workers=None, dither=GDEWDither.none, frameCache=None, onStep=None, orient=None):
+		self.show = show
+		self.files = list(files)
+		self.dwell = dwell
+		self.ahead = max(1, ahead)
+		self.workers = workers
+		self.dither = dither
+		self.frame_cache = frameCache
+		self.on_step = onStep
+		self.rotate = 0
+		self.mirror = 0
+		if (orient is not None):
+			self.rotate = orient.rotate
+			self.mirror = orient.mirror
+		self.steps = deque(maxlen=256)
+		self.running = 0
+
+	# stop after current image (e.g. from onStep or other thread)
+	def stop(self):
+		self.running = 0
+
+	# file names in play order, count images (None = no limit), loop=0 play list once
+	def order(self, count=None, loop=1):
+		n = 0
+		while (count is None or n < count):
+			for f in self.files:
+				if (count is not None and n >= count):
+					return
+				yield f
+				n += 1
+			if (loop == 0):
+				return
+
+	def run(self, count=None, loop=1):
+		cache_path = None
+		cache_entries = 64
+		if (self.frame_cache is not None):
+			cache_path = self.frame_cache.path
+			cache_entries = self.frame_cache.max_entries
+		pool = ProcessPoolExecutor(self.workers, initializer=worker_init, initargs=(cache_path, cache_entries))
+		files = self.order(count, loop)
+		pending = deque()
+		# keep queue of conversions full
+		def submit():
+			while (len(pending) < self.ahead):
+				f = next(files, None)
+				if (f is None):
+					return
+				pending.append((f, pool.submit(convert_planes, f, self.dither, self.rotate, self.mirror)))
+		self.running = 1
+		deadline = None
+		try:
+			submit()
+			while (self.running and len(pending) > 0):
+				fname, fut = pending.popleft()
+				step = { "file": fname, "result": None, "error": None, "wait": 0.0, "late": 0.0, "show": 0.0 }
+				t0 = time.monotonic()
+				planes = None
+				try:
+					planes = fut.result()
+				except Exception as ex:
+					step["error"] = ex
+				t1 = time.monotonic()
+				step["wait"] = t1 - t0
+				submit()
+				if (planes is not None):
+					if (deadline is not None):
+						if (deadline > t1):
+							time.sleep(deadline - t1)
+						step["late"] = max(0.0, t1 - max(deadline, t0))
+					t = time.monotonic()
+					deadline = t + self.dwell
+					try:
+						step["result"] = self.show(*planes)
+					except Exception as ex:
+						step["error"] = ex
+					step["show"] = time.monotonic() - t
+				self.steps.append(step)
+				if (self.on_step is not None):
+					self.on_step(step)
+		finally:
+			self.running = 0
+			pool.shutdown(wait=True, cancel_futures=True)
+		return list(self.steps)
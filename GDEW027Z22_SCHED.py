@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+
+#******************************************************************************
+# Name        : Refresh coalescing scheduler for E-INK GDEW027Z22 2,7" R/B/W
+#
+# Description : Frames (R/W + B/W planes) can be submitted at any rate, one
+#               thread send them to the display. Only the newest frame waits
+#               while the panel is busy with a refresh (frame replaced by
+#               newer one before it was shown is dropped), frame same as the
+#               one waiting or last shown is merged (no refresh for it), and
+#               refreshes start at least minInterval seconds apart. So panel
+#               time (many seconds per tri-colour refresh) goes only to the
+#               newest frame, not to frames nobody would see.
+#
+# Date        : 2026-10-18
+# License     : Beerware (rv.42) - Google for it.
+#
+# Changelog   :
+#               - 0.1 - Initial version
+#               - 0.2 - error codes of planes_update counted as errors
+#******************************************************************************
+
+import time
+import threading
+
+# Scheduler in front of eink (GDEW027Z22 driver). While it runs, display is
+# updated only by its thread (planes_update, framebuffer eink.fb stays free for
+# drawing next frame).
+#   minInterval - min seconds from start of one refresh to start of next one
+#   force       - fb_update force (1 = full refresh even of unchanged planes)
+#   onShow      - called with result dict after each shown frame:
+#                 { "seq", "result", "error", "latency", "refresh" }
+#                 (seq of frame, latency = submit to refresh start, seconds)
+# stats(): submitted, shown, dropped (replaced while waiting), merged (same as
+# waiting / shown frame), skipped (driver found nothing to refresh), errors
+# (exception or error code of planes_update).
+class GDEWRefreshScheduler:
+	def __init__(self, eink, minInterval=0.0, force=0, onShow=None):
+		self.eink = eink
+		self.min_interval = minInterval
+		self.force = force
+		self.on_show = onShow
+		self.cond = threading.Condition()
+		# waiting frame: (seq, rw, bw, submit time) or None
+		self.pending = None
+		self.last = None
+		self.busy = 0
+		self.seq = 0
+		self.last_start = None
+		self.running = 1
+		self.counts = { "submitted": 0, "shown": 0, "dropped": 0, "merged": 0, "skipped": 0, "errors": 0 }
+		self.thread = threading.Thread(target=self.worker, name="GDEWRefreshScheduler", daemon=True)
+		self.thread.start()
+
+	# submit frame planes, return its sequence number (never blocks)
+	def submit(self, rw, bw):
+		rw = bytes(rw)
+		bw = bytes(bw)
+		with self.cond:
+			if (self.running == 0):
+				raise RuntimeError("scheduler is closed")
+			self.seq += 1
+			self.counts["submitted"] += 1
+			if (self.pending is not None):
+				if (self.pending[1] == rw and self.pending[2] == bw):
+					self.counts["merged"] += 1
+					return self.pending[0]
+				self.counts["dropped"] += 1
+				self.pending = None
+			if (self.pending is None and self.last == (rw, bw)):
+				# display show (or is refreshing to) this frame already
+				self.counts["merged"] += 1
+				return self.seq
+			self.pending = (self.seq, rw, bw, time.monotonic())
+			self.cond.notify_all()
+			return self.seq
+
+	# submit current framebuffer of eink (e.g. after drawing to it)
+	def submit_fb(self):
+		return self.submit(*self.eink.fb_planes())
+
+	def worker(self):
+		while (True):
+			with self.cond:
+				while (self.running and self.pending is None):
+					self.cond.wait()
+				if (self.pending is None):
+					return
+				# keep refreshes minInterval apart, newer frame can come meanwhile
+				while (self.running and self.last_start is not None):
+					left = self.last_start + self.min_interval - time.monotonic()
+					if (left <= 0):
+						break
+					self.cond.wait(left)
+				if (self.pending is None):
+					# dropped by close() or merged away meanwhile
+					continue
+				seq, rw, bw, t_submit = self.pending
+				self.pending = None
+				self.busy = 1
+				self.last = (rw, bw)
+			r = { "seq": seq, "result": None, "error": None }
+			t0 = time.monotonic()
+			try:
+				r["result"] = self.eink.planes_update(rw, bw, self.force)
+			except Exception as ex:
+				r["error"] = ex
+			t1 = time.monotonic()
+			r["latency"] = t0 - t_submit
+			r["refresh"] = t1 - t0
+			with self.cond:
+				self.busy = 0
+				if (r["error"] is not None or (r["result"] is not None and r["result"] > 0)):
+					# exception or planes_update error code (bad planes, failed send)
+					self.counts["errors"] += 1
+					# display state is not known, same frame can be sent again
+					self.last = None
+				elif (r["result"] == -1):
+					self.counts["skipped"] += 1
+				else:
+					self.counts["shown"] += 1
+					self.last_start = t0
+				self.cond.notify_all()
+			if (self.on_show is not None):
+				self.on_show(r)
+
+	# wait until no frame is waiting or being shown, return 0 on timeout
+	def flush(self, timeout=None):
+		deadline = None
+		if (timeout is not None):
+			deadline = time.monotonic() + timeout
+		with self.cond:
+			while (self.pending is not None or self.busy):
+				left = None
+				if (deadline is not None):
+					left = deadline - time.monotonic()
+					if (left <= 0):
+						return 0
+				self.cond.wait(left)
+		return 1
+
+	# stop the thread, waiting frame is shown first (flush=1) or dropped
+	def close(self, flush=1):
+		if (flush):
+			self.flush()
+		with self.cond:
+			self.running = 0
+			if (self.pending is not None):
+				self.counts["dropped"] += 1
+				self.pending = None
+			self.cond.notify_all()
+		self.thread.join()
+
+	def stats(self):
+		with self.cond:
+			return dict(self.counts)
@@ -0,0 +1,577 @@
+#!/usr/bin/python3
+
+#******************************************************************************
+# Name        : Simulated EK79652 controller for E-INK GDEW027Z22 2,7" R/B/W
+#
+# Description : In-memory model of the display controller, so the driver can
+#               be tested and benchmarked on any Linux box (no Pi, no display).
+#               EK79652Sim - decode command stream (D/C + bytes) into
+#                            controller state: DTM1/DTM2 RAM (0x10/0x13),
+#                            partial windows (0x14/0x15/0x16), refresh (0x11),
+#                            PON/POF, deep sleep, LUTs and other registers.
+#                            BUSY is held low for configured time after
+#                            PON and refresh.
+#               SimGPIO    - RPi.GPIO look-alike wired to the controller
+#                            (decode bitbang SPI waveform too).
+#               SimSpiDev  - spidev look-alike, also decode SPI_IOC_MESSAGE,
+#                            optionally takes SPI wire time (wireTime=1).
+#               GpiomemDecoder - decode GPIO register writes (waveform) of
+#                            GDEWGpiomemTransport and check SPI timing rules.
+#               GDEWSimTransport, GDEWSimBitbangTransport,
+#               GDEWSimGpiomemTransport - transports for GDEW027Z22 driver
+#               that use simulated spidev/GPIO/registers, so the same code as
+#               on hardware is run. All count bytes, ioctls and GPIO writes
+#               (see counters()).
+#
+# Date        : 2026-10-18
+# License     : Beerware (rv.42) - Google for it.
+#
+# Changelog   :
+#               - 0.1 - Initial version
+#               - 0.2 - SPI wire time model
+#               - 0.3 - GPIO registers (gpiomem) waveform decoder
+#******************************************************************************
+
+import os
+import time
+import ctypes
+import tempfile
+import threading
+from GDEW027Z22_IO import GDEWSpidevTransport, GDEWBitbangTransport, GDEWGpiomemTransport, GDEWXferMode, spi_ioc_transfer
+from GDEW027Z22_IO import GPIO_FSEL0, GPIO_SET0, GPIO_CLR0, GPIO_FSEL_OUT
+
+# controller commands
+CMD_PSR=0x00
+CMD_PWR=0x01
+CMD_POF=0x02
+CMD_PON=0x04
+CMD_BTST=0x06
+CMD_DSLP=0x07
+CMD_DTM1=0x10
+CMD_DSP=0x11
+CMD_DRF=0x12
+CMD_DTM2=0x13
+CMD_PDTM1=0x14
+CMD_PDTM2=0x15
+CMD_PDRF=0x16
+CMD_LUTC=0x20
+CMD_LUTBB=0x24
+CMD_REV=0x70
+CMD_FLG=0x71
+
+# commands after which data byte is read from controller
+READ_CMDS=(CMD_DSP, CMD_REV, CMD_FLG)
+
+class EK79652Sim:
+	# refreshTime/partialTime/ponTime are BUSY low times in seconds, all multiplied by timeScale
+	def __init__(self, refreshTime=15.0, partialTime=4.0, ponTime=0.08, timeScale=1.0, width=176, height=264):
+		self.refresh_time = refreshTime * timeScale
+		self.partial_time = partialTime * timeScale
+		self.pon_time = ponTime * timeScale
+		self.row_bytes = width // 8
+		self.plane_size = self.row_bytes * height
+		self.lock = threading.Lock()
+		self.reset()
+
+	# hardware reset: registers and RAM are lost
+	def reset(self):
+		self.cmd = None
+		self.data = bytearray()
+		self.regs = {}
+		self.lut = {}
+		self.ram = { CMD_DTM1: bytearray(self.plane_size), CMD_DTM2: bytearray(self.plane_size) }
+		# bytes written to each RAM since command (DSP return 0x80 when both are full)
+		self.ram_written = { CMD_DTM1: 0, CMD_DTM2: 0 }
+		# what panel show (rw, bw)
+		self.screen = (bytes(self.plane_size), bytes(self.plane_size))
+		self.powered = 0
+		self.sleeping = 0
+		self.busy_until = 0.0
+		self.read_value = 0xff
+		self.commands = {}
+		self.refreshes = 0
+		self.partial_refreshes = 0
+		self.last_window = None
+		self.resets = getattr(self, "resets", -1) + 1
+
+	def busy_for(self, t):
+		self.busy_until = time.monotonic() + t
+
+	# BUSY pin level, low when controller is busy
+	def bsy(self):
+		if (time.monotonic() < self.busy_until):
+			return 0
+		return 1
+
+	# seconds until BUSY goes high
+	def busy_left(self):
+		return max(0.0, self.busy_until - time.monotonic())
+
+	# one byte clocked: dc=0 command, dc=1 data/parameter.
+	# Return byte driven by controller (when command is followed by read).
+	def write(self, dc, b):
+		with self.lock:
+			if (self.sleeping):
+				return 0xff
+			if (dc == 0):
+				self.command(b)
+			elif (self.cmd in READ_CMDS):
+				return self.read_value
+			else:
+				self.param(b)
+			return 0x00
+
+	def command(self, c):
+		self.cmd = c
+		self.data = bytearray()
+		self.commands[c] = self.commands.get(c, 0) + 1
+		if (c == CMD_DTM1 or c == CMD_DTM2):
+			self.ram_written[c] = 0
+		elif (c == CMD_PON):
+			self.powered = 1
+			self.busy_for(self.pon_time)
+		elif (c == CMD_POF):
+			self.powered = 0
+		elif (c == CMD_DSP or c == CMD_DRF):
+			full = (self.ram_written[CMD_DTM1] >= self.plane_size and self.ram_written[CMD_DTM2] >= self.plane_size)
+			self.read_value = 0x80 if full else 0x00
+			self.refresh(None)
+
+	def param(self, b):
+		c = self.cmd
+		if (c is None):
+			return
+		if (c == CMD_DTM1 or c == CMD_DTM2):
+			i = self.ram_written[c]
+			if (i < self.plane_size):
+				self.ram[c][i] = b
+			self.ram_written[c] = i + 1
+			return
+		self.data.append(b)
+		n = len(self.data)
+		if (c == CMD_PDTM1 or c == CMD_PDTM2):
+			if (n > 8):
+				win = self.window(self.data)
+				r0, r1, b0, b1 = win
+				k = n - 9
+				w = b1 - b0 + 1
+				if (k < w * (r1 - r0 + 1)):
+					ram = self.ram[CMD_DTM1 if c == CMD_PDTM1 else CMD_DTM2]
+					ram[(r0 + k // w) * self.row_bytes + b0 + k % w] = b
+		elif (c == CMD_PDRF and n == 8):
+			self.refresh(self.window(self.data))
+		elif (c == CMD_DSLP and n == 1 and b == 0xa5):
+			self.sleeping = 1
+			self.powered = 0
+		elif (c >= CMD_LUTC and c <= CMD_LUTBB):
+			self.lut[c] = bytes(self.data)
+		else:
+			self.regs[c] = bytes(self.data)
+
+	# window parameters (X, Y, W, L) => (row_first, row_last, byte_first, byte_last)
+	def window(self, p):
+		x = ((p[0] & 0x01) << 8) | (p[1] & 0xf8)
+		y = ((p[2] & 0x01) << 8) | p[3]
+		w = ((p[4] & 0x01) << 8) | (p[5] & 0xf8)
+		l = ((p[6] & 0x01) << 8) | p[7]
+		return (y, y + l - 1, x // 8, (x + w) // 8 - 1)
+
+	def refresh(self, win):
+		rw = bytes(self.ram[CMD_DTM2])
+		bw = bytes(self.ram[CMD_DTM1])
+		if (win is None):
+			self.screen = (rw, bw)
+			self.refreshes += 1
+			self.busy_for(self.refresh_time)
+			return
+		srw = bytearray(self.screen[0])
+		sbw = bytearray(self.screen[1])
+		r0, r1, b0, b1 = win
+		for r in range(r0, r1 + 1):
+			a = r * self.row_bytes + b0
+			e = r * self.row_bytes + b1 + 1
+			srw[a:e] = rw[a:e]
+			sbw[a:e] = bw[a:e]
+		self.screen = (bytes(srw), bytes(sbw))
+		self.partial_refreshes += 1
+		self.last_window = win
+		self.busy_for(self.partial_time)
+
+	def read(self):
+		return self.read_value
+
+# RPi.GPIO look-alike. /RST, D/C and BUSY pins are wired to the controller,
+# when clk/dta/cs pins are given bitbang SPI waveform is decoded too.
+class SimGPIO:
+	BCM=11
+	BOARD=10
+	OUT=0
+	IN=1
+	PUD_UP=22
+	PUD_DOWN=21
+	RISING=31
+	FALLING=32
+	BOTH=33
+
+	def __init__(self, ctrl, dcPin=25, rstPin=24, bsyPin=23, csPin=None, clkPin=None, dtaPin=None):
+		self.ctrl = ctrl
+		self.pin_dc = dcPin
+		self.pin_rst = rstPin
+		self.pin_bsy = bsyPin
+		self.pin_cs = csPin
+		self.pin_clk = clkPin
+		self.pin_dta = dtaPin
+		self.level = {}
+		self.direction = {}
+		self.events = {}
+		self.outputs = 0
+		self.toggles = 0
+		self.setups = 0
+		# bitbang decoder: bits clocked in (DATA is output) / out (DATA is input) since CS low
+		self.bits = 0
+		self.wbits = 0
+		self.rbits = 0
+		self.bytes = 0
+		self.cs_violations = 0
+
+	def setmode(self, mode):
+		pass
+
+	def cleanup(self, pins=None):
+		for pin in list(self.events.keys()):
+			if (pins is None or pin in pins):
+				self.remove_event_detect(pin)
+
+	def setup(self, pin, direction, initial=None, pull_up_down=None):
+		self.setups += 1
+		self.direction[pin] = direction
+		if (initial is not None):
+			self.output(pin, initial)
+		elif (pin not in self.level):
+			self.level[pin] = 1
+
+	def output(self, pin, value):
+		value = 1 if value else 0
+		old = self.level.get(pin, 1)
+		self.outputs += 1
+		self.level[pin] = value
+		if (old == value):
+			return
+		self.toggles += 1
+		if (pin == self.pin_rst and value == 1):
+			self.ctrl.reset()
+		elif (pin == self.pin_cs):
+			if (value == 0):
+				self.bits = self.wbits = self.rbits = 0
+			elif (self.wbits == 8 and self.rbits == 0):
+				self.bytes += 1
+				self.ctrl.write(self.level.get(self.pin_dc, 1), self.bits)
+			elif (self.wbits > 0 or (self.rbits != 0 and self.rbits != 8)):
+				self.cs_violations += 1
+		elif (pin == self.pin_clk and value == 1 and self.level.get(self.pin_cs, 1) == 0):
+			if (self.direction.get(self.pin_dta) == self.OUT):
+				self.bits = ((self.bits << 1) | self.level.get(self.pin_dta, 1)) & 0xff
+				self.wbits += 1
+			else:
+				self.rbits += 1
+
+	def input(self, pin):
+		if (pin == self.pin_bsy):
+			return self.ctrl.bsy()
+		if (pin == self.pin_dta and self.direction.get(pin) == self.IN and self.level.get(self.pin_cs, 1) == 0):
+			# controller drive DATA when it is read, MSB first, next bit after clock rising edge
+			if (self.rbits >= 8):
+				return 1
+			return (self.ctrl.read() >> (7 - self.rbits)) & 0x01
+		return self.level.get(pin, 1)
+
+	def wait_for_edge(self, pin, edge, timeout=None, bouncetime=None):
+		if (pin != self.pin_bsy):
+			raise RuntimeError("SimGPIO: edge detection only on BUSY pin")
+		left = self.ctrl.busy_left()
+		if (left <= 0):
+			if (timeout is not None):
+				time.sleep(timeout / 1000.0)
+			return None
+		if (timeout is not None and left > timeout / 1000.0):
+			time.sleep(timeout / 1000.0)
+			return None
+		time.sleep(left)
+		return pin
+
+	def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+		if (pin != self.pin_bsy):
+			raise RuntimeError("SimGPIO: edge detection only on BUSY pin")
+		if (pin in self.events):
+			raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+		t = None
+		left = self.ctrl.busy_left()
+		if (left > 0 and callback is not None):
+			t = threading.Timer(left, callback, [pin])
+			t.daemon = True
+			t.start()
+		self.events[pin] = t
+
+	def remove_event_detect(self, pin):
+		t = self.events.pop(pin, None)
+		if (t is not None):
+			t.cancel()
+
+# spidev.SpiDev look-alike. Every xfer/ioctl call is one frame for the
+# controller only when CS is released after each byte (else cs_violations++).
+# wireTime=1: each transfer sleeps for time it would take on the wire (8 clocks per
+# byte at max_speed_hz + segment delays), like blocking ioctl, releasing the GIL.
+class SimSpiDev:
+	def __init__(self, ctrl, gpio, wireTime=0):
+		self.ctrl = ctrl
+		self.gpio = gpio
+		self.wire_time = wireTime
+		self.mode = 0
+		self.max_speed_hz = 500000
+		self.ioctls = 0
+		self.bytes = 0
+		self.cs_violations = 0
+
+	def open(self, bus, cs):
+		pass
+
+	def close(self):
+		pass
+
+	def fileno(self):
+		return -1
+
+	def dc(self):
+		return self.gpio.level.get(self.gpio.pin_dc, 1)
+
+	# CS is held for whole list (single ioctl)
+	def xfer(self, data, speed_hz=0, delay_usecs=0, bits_per_word=8):
+		self.ioctls += 1
+		if (len(data) > 1):
+			self.cs_violations += 1
+		r = []
+		for b in data:
+			self.bytes += 1
+			r.append(self.ctrl.write(self.dc(), b & 0xff))
+		if (self.wire_time):
+			time.sleep(len(data) * 8.0 / self.max_speed_hz + delay_usecs / 1000000.0)
+		return r
+
+	def xfer2(self, data, speed_hz=0, delay_usecs=0, bits_per_word=8):
+		return self.xfer(data, speed_hz, delay_usecs, bits_per_word)
+
+	def writebytes(self, data):
+		self.xfer(data)
+
+	# SPI_IOC_MESSAGE(n): CS released after segment with cs_change (and after last one without it)
+	def ioctl(self, fd, req, segs):
+		self.ioctls += 1
+		n = ((req >> 16) & 0x3fff) // ctypes.sizeof(spi_ioc_transfer)
+		dc = self.dc()
+		frame = 0
+		wire = 0.0
+		for i in range(0, n):
+			s = segs[i]
+			d = ctypes.string_at(s.tx_buf, s.len)
+			frame += s.len
+			for b in d:
+				self.ctrl.write(dc, b)
+			self.bytes += s.len
+			wire += s.len * 8.0 / (s.speed_hz or self.max_speed_hz) + s.delay_usecs / 1000000.0
+			last = (i == n - 1)
+			if (s.cs_change != last):
+				if (frame > 1):
+					self.cs_violations += 1
+				frame = 0
+			elif (last):
+				# CS left active after message
+				self.cs_violations += 1
+		if (self.wire_time):
+			time.sleep(wire)
+		return 0
+
+def sim_stats(ctrl, gpio, spi=None):
+	st = {
+		"bytes": gpio.bytes,
+		"ioctls": 0,
+		"gpio_outputs": gpio.outputs,
+		"gpio_toggles": gpio.toggles,
+		"gpio_setups": gpio.setups,
+		"cs_violations": gpio.cs_violations,
+		"refreshes": ctrl.refreshes,
+		"partial_refreshes": ctrl.partial_refreshes,
+		"resets": ctrl.resets
+	}
+	if (spi is not None):
+		st["bytes"] = spi.bytes
+		st["ioctls"] = spi.ioctls
+		st["cs_violations"] += spi.cs_violations
+	return st
+
+# Hardware SPI transport running on simulated spidev + GPIO.
+# Controller is in self.ctrl, counters in counters().
+class GDEWSimTransport(GDEWSpidevTransport):
+	def __init__(self, xferMode=GDEWXferMode.batch, refreshTime=15.0, partialTime=4.0, ponTime=0.08, timeScale=1.0, dcPin=25, rstPin=24, bsyPin=23, halfBitDelay=0, ctrl=None, spiClockHz=8000000, wireTime=0):
+		if (ctrl is None):
+			ctrl = EK79652Sim(refreshTime, partialTime, ponTime, timeScale)
+		self.ctrl = ctrl
+		gpio = SimGPIO(ctrl, dcPin, rstPin, bsyPin)
+		spi = SimSpiDev(ctrl, gpio, wireTime)
+		GDEWSpidevTransport.__init__(self, spiClockHz=spiClockHz, dcPin=dcPin, rstPin=rstPin, bsyPin=bsyPin, halfBitDelay=halfBitDelay, xferMode=xferMode, spi=spi, gpio=gpio)
+		self.ioctl = spi.ioctl
+
+	def counters(self):
+		return sim_stats(self.ctrl, self.gpio, self.spi)
+
+# Bitbang transport running on simulated GPIO (waveform is decoded by SimGPIO)
+class GDEWSimBitbangTransport(GDEWBitbangTransport):
+	def __init__(self, refreshTime=15.0, partialTime=4.0, ponTime=0.08, timeScale=1.0, dtaPin=9, clkPin=11, csPin=8, dcPin=25, rstPin=24, bsyPin=23, halfBitDelay=0, ctrl=None):
+		if (ctrl is None):
+			ctrl = EK79652Sim(refreshTime, partialTime, ponTime, timeScale)
+		self.ctrl = ctrl
+		gpio = SimGPIO(ctrl, dcPin, rstPin, bsyPin, csPin, clkPin, dtaPin)
+		GDEWBitbangTransport.__init__(self, dtaPin, clkPin, csPin, dcPin, rstPin, bsyPin, halfBitDelay, gpio=gpio)
+
+	def counters(self):
+		return sim_stats(self.ctrl, self.gpio)
+
+# Decoder of GPIO register writes (register, value) as made by GDEWGpiomemTransport,
+# wired to controller like SimGPIO. Each write is one moment in time, rules checked
+# (violations++ when broken):
+#   - CS released only after 0 or 8 clocks
+#   - DATA (output) does not change while CLK is high or in the same write as CLK rising edge
+#   - D/C does not change while CS is low
+class GpiomemDecoder:
+	def __init__(self, ctrl, dtaPin=9, clkPin=11, csPin=8, dcPin=25, rstPin=24):
+		self.ctrl = ctrl
+		self.dta = 1 << dtaPin
+		self.clk = 1 << clkPin
+		self.cs = 1 << csPin
+		self.dc = 1 << dcPin
+		self.rst = 1 << rstPin
+		self.pin_dta = dtaPin
+		self.level = self.cs | self.dc | self.rst
+		self.fsel = {}
+		self.writes = 0
+		self.toggles = 0
+		self.setups = 0
+		self.bits = 0
+		self.wbits = 0
+		self.rbits = 0
+		self.bytes = 0
+		self.violations = 0
+
+	def dta_out(self):
+		reg = GPIO_FSEL0 + self.pin_dta // 10
+		return ((self.fsel.get(reg, 0) >> ((self.pin_dta % 10) * 3)) & 7) == GPIO_FSEL_OUT
+
+	def feed(self, reg, v):
+		self.writes += 1
+		if (reg == GPIO_SET0):
+			new = self.level | v
+		elif (reg == GPIO_CLR0):
+			new = self.level & ~v
+		else:
+			if (reg < GPIO_SET0):
+				self.setups += 1
+				self.fsel[reg] = v
+			return
+		old = self.level
+		self.level = new
+		changed = old ^ new
+		if (changed == 0):
+			return
+		self.toggles += 1
+		cs_low = (old & self.cs) == 0
+		if (changed & self.rst and new & self.rst):
+			self.ctrl.reset()
+		if (cs_low and changed & self.dc):
+			self.violations += 1
+		if (changed & self.dta and cs_low and self.dta_out()):
+			if (old & self.clk and new & self.clk):
+				self.violations += 1
+			elif (changed & self.clk and new & self.clk):
+				self.violations += 1
+		if (changed & self.cs):
+			if (new & self.cs == 0):
+				self.bits = self.wbits = self.rbits = 0
+			elif (self.wbits == 8 and self.rbits == 0):
+				self.bytes += 1
+				self.ctrl.write(1 if new & self.dc else 0, self.bits)
+			elif (self.wbits > 0 or (self.rbits != 0 and self.rbits != 8)):
+				self.violations += 1
+		elif (changed & self.clk and new & self.clk and (new & self.cs) == 0):
+			if (self.dta_out()):
+				self.bits = ((self.bits << 1) | (1 if new & self.dta else 0)) & 0xff
+				self.wbits += 1
+			else:
+				self.rbits += 1
+
+	# level of DATA pin driven by controller (while it is input and CS is low)
+	def dta_read(self):
+		if (self.rbits >= 8):
+			return 1
+		return (self.ctrl.read() >> (7 - self.rbits)) & 0x01
+
+# GPIO registers transport on a regular file (stand-in for /dev/gpiomem) with
+# every register write traced and decoded by GpiomemDecoder.
+class GDEWSimGpiomemTransport(GDEWGpiomemTransport):
+	def __init__(self, refreshTime=15.0, partialTime=4.0, ponTime=0.08, timeScale=1.0, dtaPin=9, clkPin=11, csPin=8, dcPin=25, rstPin=24, bsyPin=23, halfBitDelay=0, ctrl=None, regFile=None):
+		if (ctrl is None):
+			ctrl = EK79652Sim(refreshTime, partialTime, ponTime, timeScale)
+		self.ctrl = ctrl
+		self.decoder = GpiomemDecoder(ctrl, dtaPin, clkPin, csPin, dcPin, rstPin)
+		self.reg_tmp = None
+		if (regFile is None):
+			fd, regFile = tempfile.mkstemp(prefix="gpiomem.")
+			os.close(fd)
+			self.reg_tmp = regFile
+		GDEWGpiomemTransport.__init__(self, dtaPin, clkPin, csPin, dcPin, rstPin, bsyPin, halfBitDelay, regFile, [])
+		self.flush()
+
+	def close(self, keepRst=0):
+		GDEWGpiomemTransport.close(self, keepRst)
+		if (self.reg_tmp is not None):
+			os.remove(self.reg_tmp)
+			self.reg_tmp = None
+
+	# decode traced writes
+	def flush(self):
+		for reg, v in self.trace:
+			self.decoder.feed(reg, v)
+		del self.trace[:]
+
+	def reg_write(self, reg, v):
+		GDEWGpiomemTransport.reg_write(self, reg, v)
+		self.flush()
+
+	def write(self, data):
+		try:
+			GDEWGpiomemTransport.write(self, data)
+		finally:
+			self.flush()
+
+	def get_pin(self, pin):
+		if (pin == self.pin_bsy):
+			return self.ctrl.bsy()
+		if (pin == self.pin_dta and self.decoder.dta_out() == 0 and (self.decoder.level & self.decoder.cs) == 0):
+			return self.decoder.dta_read()
+		return GDEWGpiomemTransport.get_pin(self, pin)
+
+	def wait_bsy(self, timeout):
+		time.sleep(min(self.ctrl.busy_left(), timeout))
+
+	def counters(self):
+		d = self.decoder
+		ctrl = self.ctrl
+		return {
+			"bytes": d.bytes,
+			"ioctls": 0,
+			"gpio_outputs": d.writes,
+			"gpio_toggles": d.toggles,
+			"gpio_setups": d.setups,
+			"cs_violations": d.violations,
+			"refreshes": ctrl.refreshes,
+			"partial_refreshes": ctrl.partial_refreshes,
+			"resets": ctrl.resets
+		}
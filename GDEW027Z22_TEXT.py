@@ -0,0 +1,226 @@
+#!/usr/bin/python3
+
+#******************************************************************************
+# Name        : Text rendering into planes for E-INK GDEW027Z22 2,7" R/B/W
+#
+# Description : Font (TrueType file or PIL default font) at given size is
+#               rasterised once into glyph atlas: every glyph is a list of
+#               bit-packed rows already in panel layout (rotation/mirror of
+#               the orientation applied), so drawing text is OR / AND-NOT
+#               of few bytes per glyph row into R/W and B/W planes - no PIL
+#               image of the frame and no repacking of the whole frame.
+#               Glyph mask is coverage >= 0x80, so text look the same as
+#               ImageDraw.text on RGB image packed with pack_planes.
+#               GDEWGlyphCache keeps atlases per font, size and orientation
+#               (least recently used atlas is dropped, glyphs out of the
+#               pre-rasterised set are added up to maxGlyphs per atlas) and
+#               count hits and misses.
+#
+# Date        : 2026-10-18
+# License     : Beerware (rv.42) - Google for it.
+#
+# Changelog   :
+#               - 0.1 - Initial version
+#******************************************************************************
+
+import threading
+from collections import OrderedDict
+# PIL is imported when first atlas is made (start-up time, see bench.py)
+
+# glyphs rasterised when atlas is made (printable ASCII)
+ATLAS_CHARS = "".join(chr(c) for c in range(0x20, 0x7f))
+
+# font object: font = path of TrueType/OpenType file or None (PIL default font)
+def load_font(font, size):
+	from PIL import ImageFont
+	if (font is None):
+		try:
+			return ImageFont.load_default(size)
+		except TypeError:
+			# PIL < 10.1: only fixed size bitmap font
+			return ImageFont.load_default()
+	return ImageFont.truetype(font, size)
+
+# Glyphs of one font, size and orientation (GDEWOrientation, only rotate and
+# mirror matter). Glyph is tuple (advance, dx, dy, nbytes, rows):
+#   dx, dy - native position of first row bit relative to native position of
+#            text origin (left of glyph, top of line)
+#   rows   - native rows (top-down) as ints, nbytes*8 bits, MSB = native x dx,
+#            with one spare byte so row shifted by x & 7 fit in nbytes
+class GDEWGlyphAtlas:
+	def __init__(self, font=None, size=16, orient=None, chars=ATLAS_CHARS, maxGlyphs=256):
+		self.font_name = font
+		self.size = size
+		self.font = load_font(font, size)
+		self.orient = orient
+		self.max_glyphs = max(maxGlyphs, len(chars))
+		self.glyphs = OrderedDict()
+		if (hasattr(self.font, "getmetrics")):
+			ascent, descent = self.font.getmetrics()
+			self.line_height = ascent + descent
+		else:
+			self.line_height = self.font.getbbox("Ag")[3]
+		for ch in chars:
+			self.glyphs[ch] = self.rasterise(ch)
+
+	# linear part of orientation: native offset of logical offset x, y
+	def native_offset(self, x, y):
+		if (self.orient is None or self.orient.perm is None):
+			return (x, y)
+		x0, y0 = self.orient.to_native(0, 0)
+		nx, ny = self.orient.to_native(x, y)
+		return (nx - x0, ny - y0)
+
+	def rasterise(self, ch):
+		from PIL import Image, ImageDraw
+		advance = self.font.getlength(ch)
+		x0, y0, x1, y1 = self.font.getbbox(ch)
+		if (x1 <= x0 or y1 <= y0):
+			return (advance, 0, 0, 1, [])
+		im = Image.new("L", (x1 - x0, y1 - y0), 0)
+		ImageDraw.Draw(im).text((-x0, -y0), ch, fill=0xff, font=self.font)
+		w, h = im.size
+		pix = im.tobytes()
+		# set pixels in native coordinates (relative to text origin)
+		pts = []
+		for y in range(0, h):
+			for x in range(0, w):
+				if (pix[y * w + x] >= 0x80):
+					pts.append(self.native_offset(x0 + x, y0 + y))
+		if (len(pts) == 0):
+			return (advance, 0, 0, 1, [])
+		dx = min(p[0] for p in pts)
+		dy = min(p[1] for p in pts)
+		nw = max(p[0] for p in pts) - dx + 1
+		nh = max(p[1] for p in pts) - dy + 1
+		nbytes = (nw + 7) // 8 + 1
+		rows = [0] * nh
+		for x, y in pts:
+			rows[y - dy] |= 1 << (nbytes * 8 - 1 - (x - dx))
+		return (advance, dx, dy, nbytes, rows)
+
+	# glyph of ch, rasterised on first use (counted in cache stats as miss)
+	def glyph(self, ch, cache=None):
+		g = self.glyphs.get(ch)
+		if (g is not None):
+			self.glyphs.move_to_end(ch)
+			if (cache is not None):
+				cache.glyph_hits += 1
+			return g
+		if (cache is not None):
+			cache.glyph_misses += 1
+		g = self.rasterise(ch)
+		self.glyphs[ch] = g
+		if (len(self.glyphs) > self.max_glyphs):
+			self.glyphs.popitem(last=False)
+		return g
+
+	# width of text line in pixels
+	def text_width(self, text):
+		return int(round(sum(self.glyph(ch)[0] for ch in text)))
+
+	# draw text into framebuffer fb (GDEWFrameBuffer) at logical x, y (top left
+	# of first line) of orientation orient, color white=0, black=1, red=2.
+	# Text is transparent (only glyph pixels are set). "\n" start next line.
+	# Return x after last glyph of last line.
+	def draw(self, fb, x, y, text, color=1, orient=None, cache=None):
+		if (orient is None):
+			orient = self.orient
+		# plane which bits are set and planes which bits are cleared
+		if (color == 2):
+			on, off = fb.rw, (fb.bw,)
+		elif (color == 1):
+			on, off = fb.bw, (fb.rw,)
+		else:
+			on, off = None, (fb.rw, fb.bw)
+		row_bytes = fb.row_bytes
+		pen = 0.0
+		for ch in text:
+			if (ch == "\n"):
+				pen = 0.0
+				y = y + self.line_height
+				continue
+			advance, dx, dy, nbytes, rows = self.glyph(ch, cache)
+			if (len(rows) > 0):
+				if (orient is None or orient.perm is None):
+					ox, oy = (x + int(round(pen)), y)
+				else:
+					ox, oy = orient.to_native(x + int(round(pen)), y)
+				nx = ox + dx
+				shift = nx & 7
+				bx = nx >> 3
+				ny = oy + dy
+				for r in range(0, len(rows)):
+					yy = ny + r
+					if (yy < 0 or yy >= fb.height or rows[r] == 0):
+						continue
+					base = fb.row_index(yy)
+					k = bx
+					for b in (rows[r] >> shift).to_bytes(nbytes, "big"):
+						if (b and k >= 0 and k < row_bytes):
+							i = base + k
+							if (on is not None):
+								on[i] |= b
+							for p in off:
+								p[i] &= ~b & 0xff
+						k += 1
+			pen += advance
+		return x + int(round(pen))
+
+# Bounded cache of glyph atlases, key: font, size, rotate, mirror.
+#   maxAtlases - atlases kept (least recently used is dropped)
+#   maxGlyphs  - glyphs kept per atlas (at least the pre-rasterised set)
+# stats(): atlas/glyph hits and misses, evictions, atlases and glyphs held.
+class GDEWGlyphCache:
+	def __init__(self, maxAtlases=8, maxGlyphs=256):
+		self.max_atlases = maxAtlases
+		self.max_glyphs = maxGlyphs
+		self.atlases = OrderedDict()
+		self.lock = threading.Lock()
+		self.reset_stats()
+
+	def reset_stats(self):
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.glyph_hits = 0
+		self.glyph_misses = 0
+
+	# atlas of font at size for orientation orient (GDEWOrientation or None)
+	def atlas(self, font=None, size=16, orient=None):
+		key = (font, size, 0, 0)
+		if (orient is not None and orient.perm is not None):
+			key = (font, size, orient.rotate, orient.mirror)
+		with self.lock:
+			a = self.atlases.get(key)
+			if (a is not None):
+				self.atlases.move_to_end(key)
+				self.hits += 1
+				return a
+			self.misses += 1
+		a = GDEWGlyphAtlas(font, size, orient, maxGlyphs=self.max_glyphs)
+		with self.lock:
+			self.atlases[key] = a
+			while (len(self.atlases) > self.max_atlases):
+				self.atlases.popitem(last=False)
+				self.evictions += 1
+		return a
+
+	# draw text into fb, see GDEWGlyphAtlas.draw
+	def draw(self, fb, x, y, text, color=1, font=None, size=16, orient=None):
+		a = self.atlas(font, size, orient)
+		with self.lock:
+			return a.draw(fb, x, y, text, color, orient, self)
+
+	def stats(self):
+		with self.lock:
+			return { "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "atlases": len(self.atlases),
+				"glyph_hits": self.glyph_hits, "glyph_misses": self.glyph_misses,
+				"glyphs": sum(len(a.glyphs) for a in self.atlases.values()) }
+
+	def clear(self):
+		with self.lock:
+			self.atlases.clear()
+
+# cache shared by drivers (GDEW027Z22.fb_text) in this process
+glyph_cache = GDEWGlyphCache()
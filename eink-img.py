@@ -20,22 +20,93 @@
 # 
 # Changelog   :
 #               - 0.1 - Initial version
+#               - 0.2 - -w option: warm attach (skip reset/init when controller
+#                       was left initialized by previous run)
+#               - 0.3 - converted images are cached (GDEW027Z22_CACHE.py),
+#                       -n option: do not use cache
+#               - 0.4 - -b / -f options: Bayer / Floyd-Steinberg dithering
+#               - 0.5 - daemon mode (-D) and client: image is sent to running
+#                       daemon (GDEW027Z22_DAEMON.py) when there is one
+#               - 0.6 - -o option: convert image to raw planes file (no display),
+#                       raw planes are shown without decoding (PIL is not loaded)
+#               - 0.7 - -p option: playlist (slideshow) of directories / files,
+#                       next images are converted while current one refresh
+#               - 0.8 - batched SPI transfers (GDEWXferMode.batch) by default,
+#                       -x option: one transfer per byte
 #******************************************************************************
 
-import time
-import spidev
 import sys
-import GDEW027Z22
 import os.path
+from GDEW027Z22_DAEMON import daemon_request, default_socket_path
+from GDEW027Z22_FB import is_raw, load_raw, save_raw, convert_image
 
 
 print("E-INK GDEW027Z22 (2.7\" Red/Black/White) image loader.")
 print("Author: saper_2 (2018-02-23)")
 print(" ")
 
+# take option from command line, return 1 if it was given
+def option(name):
+	if (name in sys.argv):
+		sys.argv.remove(name)
+		return 1
+	return 0
+
+# -w: warm attach, controller is left powered on at exit for next run
+warm=option("-w")
+
+# -n: no frame cache
+cache=1-option("-n")
+
+# -x: one spidev transfer per byte (default: batched, up to 511 bytes per ioctl)
+bytexfer=option("-x")
+
+# -b / -f: dither image (for photos) with Bayer / Floyd-Steinberg (GDEWDither values)
+dither=0
+if (option("-b")):
+	dither=1
+if (option("-f")):
+	dither=2
+
+# -o out_file: convert image to raw planes file and quit (display is not used)
+outfile=None
+if ("-o" in sys.argv):
+	i = sys.argv.index("-o")
+	if (i + 1 < len(sys.argv)):
+		outfile = sys.argv.pop(i + 1)
+	sys.argv.pop(i)
+
+# -p dwell: playlist, show images (arguments: files or directories) one after
+# other for dwell seconds each, in loop (Ctrl+C to stop)
+dwell=None
+if ("-p" in sys.argv):
+	i = sys.argv.index("-p")
+	if (i + 1 < len(sys.argv)):
+		dwell = float(sys.argv.pop(i + 1))
+	sys.argv.pop(i)
+
+# -D: run as daemon, -l: do not use daemon, -S / -Q: put display to sleep / stop daemon
+daemon=option("-D")
+local=option("-l")
+request=None
+if (option("-S")):
+	request={ "cmd": "sleep" }
+if (option("-Q")):
+	request={ "cmd": "quit" }
+
 # check for 2nd argument or print usage and quit
-if (len(sys.argv) < 2):
-	print("Usage: {} [image_file]".format(sys.argv[0]))
+if (len(sys.argv) < 2 and daemon == 0 and request is None):
+	print("Usage: {} [-w] [-n] [-x] [-b|-f] [-l] [image_file]".format(sys.argv[0]))
+	print("       {} -D [-n] [-x] [-b|-f]   run as daemon".format(sys.argv[0]))
+	print("       {} -S | -Q           daemon: put display to sleep / stop daemon".format(sys.argv[0]))
+	print("       {} [-b|-f] -o out_file image_file   convert image to raw planes file".format(sys.argv[0]))
+	print("       {} [-w] [-n] [-b|-f] [-l] -p dwell dir_or_file...   playlist, dwell seconds per image".format(sys.argv[0]))
+	print("  image_file can be 11616 bytes raw planes file (R/W + B/W), 0 clear display")
+	print("  -w  warm attach: skip reset/init if display was left initialized by previous -w run")
+	print("  -n  do not use cache of converted images")
+	print("  -x  one SPI transfer per byte (slow, default is batched transfers)")
+	print("  -b  ordered (Bayer) dithering, -f  Floyd-Steinberg dithering (for photos)")
+	print("  -l  do not send image to daemon (even if it is running)")
 	print("\033[33;1m" "Warning:\033[0m" + "\033[33m" + " Image file\033[91m have to\033[33m size: 176 x 264 px\033[0m")
 	sys.exit(1)
 
@@ -48,10 +119,90 @@ except:
 	pass
 
 # if 2nd arg is not "0" but path to the file then check it
-if (os.path.isfile(sys.argv[1]) == False and onlyclear==0):
+if (daemon == 0 and request is None and dwell is None and os.path.isfile(sys.argv[1]) == False and onlyclear==0):
 	print("\033[33m" + "Selected file: {} does not exists or is not a file!".format(sys.argv[1]) + "\033[0m")
 	sys.exit(2)
 
+# *** convert to raw planes ***
+if (outfile is not None):
+	if (onlyclear or is_raw(sys.argv[1])):
+		print("\033[33m" + "Nothing to convert: {}".format(sys.argv[1]) + "\033[0m")
+		sys.exit(2)
+	from GDEW027Z22_FB import GDEWFrameBuffer
+	fb = GDEWFrameBuffer()
+	fb.from_pil(convert_image(sys.argv[1], dither))
+	save_raw(outfile, *fb.planes())
+	print("Raw planes saved: \033[94m{}\033[0m".format(outfile))
+	sys.exit(0)
+
+# run playlist, print steps
+def playlist(show, orient=None):
+	from GDEW027Z22_PLAYLIST import GDEWPlaylist, playlist_files
+	files = playlist_files(sys.argv[1:])
+	if (len(files) == 0):
+		print("\033[33m" + "Playlist is empty." + "\033[0m")
+		sys.exit(2)
+	frames = None
+	if (cache):
+		try:
+			from GDEW027Z22_CACHE import GDEWFrameCache
+			frames = GDEWFrameCache()
+		except Exception as ex:
+			print("\033[33m" + "Frame cache not available: {}".format(ex) + "\033[0m")
+	def step(s):
+		if (s["error"] is not None):
+			print("\033[31m" + "{}: {}".format(s["file"], s["error"]) + "\033[0m")
+			return
+		print("\033[94m{}\033[0m: shown in {:.3f}s (waited for conversion {:.3f}s, late {:.3f}s)".format(s["file"], s["show"], s["wait"], s["late"]))
+	print("Playlist: {} images, {:.1f}s each (Ctrl+C to stop).".format(len(files), dwell))
+	try:
+		GDEWPlaylist(show, files, dwell, dither=dither, frameCache=frames, onStep=step, orient=orient).run()
+	except KeyboardInterrupt:
+		pass
+
+# *** client: send request to daemon (if it is running) ***
+if (daemon == 0 and local == 0 and dwell is not None):
+	running=1
+	try:
+		daemon_request({ "cmd": "stats" })
+	except OSError:
+		running=0
+	if (running):
+		from GDEW027Z22_PLAYLIST import show_daemon
+		playlist(show_daemon())
+		sys.exit(0)
+	print("Daemon not running, using display directly.")
+elif (daemon == 0 and local == 0):
+	payload=None
+	if (request is None):
+		if (onlyclear):
+			request={ "cmd": "clear" }
+		elif (is_raw(sys.argv[1])):
+			request={ "cmd": "planes" }
+			payload = b"".join(load_raw(sys.argv[1]))
+		else:
+			request={ "cmd": "show", "path": os.path.abspath(sys.argv[1]) }
+			# without -b/-f daemon use its own dither mode (from its -b/-f)
+			if (dither != 0):
+				request["dither"] = dither
+	try:
+		resp = daemon_request(request, payload)
+	except OSError as ex:
+		if (request["cmd"] in ("sleep", "quit")):
+			print("\033[33m" + "Daemon is not running ({}): {}".format(default_socket_path(), ex) + "\033[0m")
+			sys.exit(4)
+		resp = None
+	if (resp is not None):
+		if (resp["ok"] == False):
+			print("\033[31m" + "Daemon error: {}".format(resp["error"]) + "\033[0m")
+			sys.exit(3)
+		print("Daemon: {} done in {:.3f}s (result: {}).".format(request["cmd"], resp["time"], resp["result"]))
+		sys.exit(0)
+	print("Daemon not running, using display directly.")
+
+import GDEW027Z22
+from GDEW027Z22_CACHE import GDEWFrameCache
+
 # display connections
 print("E-INK pinout:")
 print("RPi       = E-INK")
@@ -63,10 +214,49 @@ print("BCM_IO.25 = D/C")
 print("BCM_IO.18 = /Reset")
 print("BCM_IO.23 = Busy")
 # spi0: mosi=DTA, clk=CLK, cs0=cs, io25=dc, io18=rst, io23=busy, spi_f_clk= ~8MHz
-eink = GDEW027Z22.GDEW027Z22(spiBus=0, spiCs=0,spiClockHz=8000000, dcPin=25, rstPin=18, bsyPin=23)
-print("E-INK init done.")
+frames=None
+if (cache):
+	try:
+		frames = GDEWFrameCache()
+	except Exception as ex:
+		print("\033[33m" + "Frame cache not available: {}".format(ex) + "\033[0m")
+xfer = GDEW027Z22.GDEWXferMode.batch
+if (bytexfer):
+	xfer = GDEW027Z22.GDEWXferMode.byte
+eink = GDEW027Z22.GDEW027Z22(spiBus=0, spiCs=0,spiClockHz=8000000, dcPin=25, rstPin=18, bsyPin=23, xferMode=xfer, warm=warm, frameCache=frames, dither=dither)
+if (eink.warm):
+	print("E-INK attached (warm, init skipped).")
+else:
+	print("E-INK init done.")
 print(" ")
 print(" ")
+
+# *** daemon ***
+if (daemon):
+	from GDEW027Z22_DAEMON import GDEWDaemon
+	d = GDEWDaemon(eink)
+	print("Daemon listening on: \033[94m{}\033[0m".format(d.path))
+	try:
+		d.serve()
+	except KeyboardInterrupt:
+		pass
+	print("Daemon stopped, power down display...")
+	if (d.asleep == 0):
+		eink.shutdown()
+		eink.deep_sleep()
+	print("*** END. ***")
+	sys.exit(0)
+
+# *** playlist ***
+if (dwell is not None):
+	from GDEW027Z22_PLAYLIST import show_eink
+	playlist(show_eink(eink), eink.orient)
+	print("Playlist stopped, power down display...")
+	eink.shutdown()
+	eink.deep_sleep()
+	print("*** END. ***")
+	sys.exit(0)
+
 try:
 	print("Clear B/W...")
 	eink.clear_bw(0x00)
@@ -79,6 +269,7 @@ try:
 	
 	if (onlyclear == 0):
 		print("Loading file: \033[94m{}\033[0m".format(sys.argv[1]))
+		# raw planes file is loaded as is, without frame cache
 		eink.fb_load(sys.argv[1])
 		print("Updating display...")
 		eink.fb_update()
@@ -95,11 +286,13 @@ except Exception as ex:
 	print("\033[0m")
 	sys.exit(3)
 
-print("Power down display...")
-eink.shutdown()
-print("Shutdown: ok, deep sleep...")
-eink.deep_sleep()
-print("deep sleep: ok")
+if (warm):
+	print("Display left powered on (warm).")
+else:
+	print("Power down display...")
+	eink.shutdown()
+	print("Shutdown: ok, deep sleep...")
+	eink.deep_sleep()
+	print("deep sleep: ok")
 
 print("*** END. ***")
-
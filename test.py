@@ -33,7 +33,7 @@ print("E-INK GDEW027Z22 driver test program...")
 # defaults: spi=0, cs=io8, d/c=io25, rst=io24, bsy=io23 dta=miso[io9] , clk=sclk[io11]
 # does not apply because I use now SW spi (miso[io9] & mosi[io10] must be connected with 1k resistor)
 #dtaPin=9, clkPin=11, csPin=8, dcPin=25, rstPin=24, bsyPin=23
-eink = GDEW027Z22.GDEW027Z22(spiBus=0, spiCs=0,spiClockHz=8000000, dcPin=25, rstPin=18, bsyPin=23)
+eink = GDEW027Z22.GDEW027Z22(spiBus=0, spiCs=0,spiClockHz=8000000, dcPin=25, rstPin=18, bsyPin=23, xferMode=GDEW027Z22.GDEWXferMode.batch)
 print("Init done.")
 
 print("Selected testmode: {}".format(testmode))